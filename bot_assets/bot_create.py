@@ -4,7 +4,9 @@ from aiogram.fsm.storage.memory import MemoryStorage
 import asyncio
 
 from .handlers import start
-from utils import fetch_regions
+from utils import fetch_regions, create_refresh_scheduler
+from infrastructure.api_clients.async_client import close_session
+from infrastructure.render import render_service
 from configuration.config import TOKEN
 
 
@@ -17,5 +19,11 @@ async def main():
     dp = Dispatcher(bots=bot, storage=storage)
 
     _init_routers(dp)
+    render_service.start()
     await fetch_regions()
+    scheduler = create_refresh_scheduler()
+    scheduler.start()
+    dp.shutdown.register(scheduler.stop)
+    dp.shutdown.register(close_session)
+    dp.shutdown.register(render_service.stop)
     await dp.start_polling(bot)
\ No newline at end of file
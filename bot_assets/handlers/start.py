@@ -1,4 +1,4 @@
-from aiogram.filters import CommandStart
+from aiogram.filters import Command, CommandObject, CommandStart
 from aiogram.fsm.context import FSMContext
 from aiogram import Router, F
 from aiogram.types import (
@@ -17,13 +17,29 @@ from aiogram.types import (
 )
 from configuration.config import API_BASE_URL
 import aiohttp
-from infrastructure.api_clients.city_client import APIClient
+from infrastructure.api_clients.async_client import AsyncAPIClient
+from infrastructure.api_clients.catalog import catalog
 from infrastructure.api_clients.models import Statistic
+from infrastructure.profiles import profiles
+from infrastructure.rollup import RF_KEY, rollup
 from infrastructure.gen_image import generate_bas_usage_chart, generate_flights_cards, generate_regions_table, generate_flights_trend_chart
-from utils import REGIONS, plot_flights_trend, get_top_10_by_total, RATING_REGIONS
-from bot_assets.keyboards.inlines import get_main_kb, get_region_menu, get_list_regions, get_organizations
+from utils import (
+    plot_flights_trend,
+    get_top_10_by_total,
+    format_rank,
+    range_window,
+    format_range_stats,
+    format_duration,
+    format_regions_table,
+    format_region_card,
+    format_city_card,
+    format_region_cities
+)
+from bot_assets.keyboards.inlines import get_main_kb, get_region_menu, get_list_regions, get_organizations, get_range_menu, get_region_matches
 from bot_assets.states import Compare
+from bot_assets.inline_results import inline_results
 from typing import Dict
+from datetime import date
 import re
 import os
 import json
@@ -50,16 +66,15 @@ def format_top_message(top_dict: Dict[int, int]) -> str:
 @router.inline_query()
 async def inline_search(inline_query: InlineQuery):
     query = inline_query.query.strip()
-    frst_region = ''
-    if query.startswith("compare"):
-        mode = "compare"
-        frst_region = int(query.split('_')[1])
-        search_term = query[len("compare"):].strip().lower()
+    frst_region = None
+    compare = re.match(r"compare_(\d+)\s*(.*)", query)
+    if compare:
+        frst_region = int(compare.group(1))
+        search_term = compare.group(2)
     else:
-        mode = ""
-        search_term = query.lower()
+        search_term = query
 
-    if not REGIONS:
+    if not catalog.is_loaded():
         await inline_query.answer(
             [InlineQueryResultArticle(
                 id="error",
@@ -73,96 +88,85 @@ async def inline_search(inline_query: InlineQuery):
         )
         return
 
-    
-    filtered = [
-        r for r in REGIONS
-        if search_term in r["name"].lower() or search_term in r["fullname"].lower()
-    ][:50]
-
-    results = []
-    for region in filtered:
-        capital_name = region["capital"]["name"] if region.get("capital") else "Нет столицы"
-        description = f"Столица: {capital_name}"
-
-        if mode == "compare":
-            message_text = f"/compare_region_{region['id']}_{frst_region}"
-        else:
-            message_text = f"Вы выбрали регион: {region['fullname']}\nСтолица: {capital_name}"
-
-        results.append(
-            InlineQueryResultArticle(
-                id=f"{region['id']}",
-                title=region["fullname"],
-                description=description,
-                input_message_content=InputTextMessageContent(
-                    message_text=message_text
-                ),
-            )
-        )
-
-    await inline_query.answer(results, cache_time=60, is_personal=True)
+    offset = int(inline_query.offset) if inline_query.offset.isdigit() else 0
+    results, next_offset = inline_results.page(search_term, offset, frst_region)
+    # ответ для сравнения содержит id первого региона, его Telegram не должен отдавать другим пользователям
+    await inline_query.answer(
+        results,
+        cache_time=60,
+        is_personal=frst_region is not None,
+        next_offset=next_offset
+    )
 
 
 @router.chosen_inline_result()
 async def on_region_selected(chosen_result: ChosenInlineResult):
-    global RATING_REGIONS
     region_id = chosen_result.result_id
-
     user_id = chosen_result.from_user.id
-    client = APIClient()
-    region = client.get_region(region_id).get('data')
-    statistic: Statistic = client.get_statistic(region_id)
-    
-    region_text = (
-        f"📍 {statistic.name} (ID: {region_id})\n\n"
-        f"🏆 Место в рейтинге: {RATING_REGIONS.get(str(region_id))}  \n"
-        f"🛫 Всего полётов: {5932}  \n\n"
-        
-        f"📊 Статистика за {2025}  \n"
-        f"🛫 Полётов за год: {1486}  \n"
-        f"⏱️ Средняя длительность: {'1:57:12'}  \n\n"
-        
-        "🏢 Ответственный орган:  \n"
-        "Управление  Росавиации по СЗФО\n\n"
-        
-        "📌 Программа развития БАС\n"
-        "Принята 20.12.2024\n"
-        
-        "📌 Наличие ЭПР\n"
-        "Есть\n"
-        
-        "📌 Специализация региона\n"
-        "Система передачи данных с БВС\n"
-        
-        "📌 Наличие работ по БЭК\n"
-        "Есть\n\n"
-        
-        "📌 Наличие полигона БАС\n"
-        "Есть\n"
-        
-        "📌 Наличие НПЦ\n"
-        "Крупный\n"
-        
-        "📌 Процент оснащённости школ БАС,\n"
-        "12%\n"
-        
-        f"📌 Столица: {region.get('capital').get('name')}  \n"
-        f"🗺️ Тип: {region.get('type')}  \n"
-        f"👥 Население: {region.get('population')}"
-    )
+
+    if region_id.startswith("city_"):
+        city = catalog.get_city(region_id[len("city_"):])
+        region = catalog.get_city_region(city) if city else None
+        await chosen_result.bot.send_message(
+            chat_id=user_id,
+            text=format_city_card(city, region) if city else "Город не найден",
+            reply_markup=get_region_menu(region["id"]) if region else None
+        )
+        return
+
+    profile = profiles.get(region_id)
+    if profile is None:
+        await chosen_result.bot.send_message(chat_id=user_id, text="Данные по региону ещё загружаются, попробуйте позже.")
+        return
 
     await chosen_result.bot.send_message(
         chat_id=user_id,
-        text=region_text,
+        text=format_region_card(profile),
         reply_markup=get_region_menu(region_id)
     )
-    # await chosen_result.bot.send_photo(
-    #     chat_id=user_id,
-    #     photo=BufferedInputFile(image_bytes.getvalue(), filename="flight_trend.png")
-    # )
 
     
 
+async def send_region_card(message: Message, region_id: int):
+    profile = profiles.get(region_id)
+    if profile is None:
+        await message.answer("Данные по региону ещё загружаются, попробуйте позже.")
+        return
+    await message.answer(format_region_card(profile), reply_markup=get_region_menu(region_id))
+
+
+@router.message(Command("region"))
+async def region_command(message: Message, command: CommandObject):
+    query = (command.args or "").strip()
+    if not query:
+        await message.answer("Напишите название региона: /region Красноярский_край")
+        return
+
+    matches = catalog.match_region(query, limit=4)
+    if not matches:
+        await message.answer(f"Регион «{query.replace('_', ' ')}» не найден. Попробуйте инлайн-поиск.")
+        return
+
+    best = matches[0]
+    # при точном совпадении предлагаем только такие же точные варианты («мск» — Москва и область)
+    alternatives = [match for match in matches[1:] if best.distance or not match.distance]
+    await send_region_card(message, best.item["id"])
+    if alternatives:
+        await message.answer(
+            "Возможно, вы искали:",
+            reply_markup=get_region_matches(
+                [match.item["id"] for match in alternatives],
+                [match.item["fullname"] for match in alternatives]
+            )
+        )
+
+
+@router.callback_query(F.data.startswith('region_'))
+async def region_selected(callback_query: CallbackQuery):
+    await send_region_card(callback_query.message, int(callback_query.data.split('_')[1]))
+    await callback_query.answer()
+
+
 @router.message(CommandStart())
 async def start_message(message: Message):
     main_menu_text = (
@@ -206,20 +210,22 @@ async def void_compare(callback_query: CallbackQuery):
     first, second = map(int, callback_query.data.split('_')[1:])
 
     
-    client = APIClient()
-    region_first = client.get_region(first).get('data')
-    region_second = client.get_region(second).get('data')
-    statistic_first: Statistic = client.get_statistic(first)
-    statistic_second: Statistic = client.get_statistic(second)
+    profile_first, profile_second = profiles.get(first), profiles.get(second)
+    if profile_first is None or profile_second is None:
+        await callback_query.answer("Данные по региону ещё загружаются", show_alert=True)
+        return
+    durations_first, durations_second = profile_first.durations, profile_second.durations
 
     region_text = (
-        f"📍 {statistic_first.name} // {statistic_second.name}\n\n"
-        f"🏆 Место в рейтинге: {RATING_REGIONS.get(str(first))} //  {RATING_REGIONS.get(str(second))}\n"
-        f"🛫 Всего полётов: {5932} // {4189}   \n\n"
+        f"📍 {profile_first.name} // {profile_second.name}\n\n"
+        f"🏆 Место в рейтинге: {format_rank(first)} //  {format_rank(second)}\n"
+        f"🛫 Всего полётов: {profile_first.total_flights or 0} // {profile_second.total_flights or 0}   \n\n"
         
-        f"📊 Статистика за {2025}  \n"
-        f"🛫 Полётов за год: {1486} // {943}  \n"
-        f"⏱️ Средняя длительность: {'1:57:12'} // {'1:23:42'}  \n\n"
+        f"📊 Статистика за {profile_first.year or '—'} // {profile_second.year or '—'}  \n"
+        f"🛫 Полётов за год: {profile_first.year_flights or 0} // {profile_second.year_flights or 0}  \n"
+        f"⏱️ Средняя длительность: {format_duration(profile_first.avg_duration)} // {format_duration(profile_second.avg_duration)}  \n"
+        f"⏱️ Медиана: {format_duration(durations_first['median'])} // {format_duration(durations_second['median'])}  \n"
+        f"⏱️ p90: {format_duration(durations_first['p90'])} // {format_duration(durations_second['p90'])}  \n\n"
         
         "🏢 Ответственный орган:  \n"
         "Управление  Росавиации по СЗФО // Управление  Росавиации по СЗФО\n\n"
@@ -245,7 +251,7 @@ async def void_compare(callback_query: CallbackQuery):
         "📌 Процент оснащённости школ БАС,\n"
         "12% // 11%\n\n"
         
-        f"👥 Население: {region_first.get('population')} // {region_second.get('population')}"
+        f"👥 Население: {profile_first.population or '—'} // {profile_second.population or '—'}"
     )
     await callback_query.message.answer(text=region_text, reply_markup=get_region_menu(first))
 
@@ -283,154 +289,17 @@ async def last_flights(callback_query: CallbackQuery):
 
 @router.callback_query(F.data.startswith('table_regions'))
 async def get_table_regions(callback_query: CallbackQuery):
-    text = """📊 ТОП-15 РЕГИОНОВ ПО АКТИВНОСТИ БПЛА
-
-    —
-
-    🥇 #1 Москва  
-    • Полёты: 3 200  
-    • Длительность: 5 100 ч  
-    • Ср. время: 0.95 ч  
-    • Рост: +12% 🟢  
-    • Плотность: 72
-
-    —
-
-    🥈 #2 Татарстан  
-    • Полёты: 2 800  
-    • Длительность: 5 100 ч  
-    • Ср. время: 0.95 ч  
-    • Рост: -5% 🔴  
-    • Плотность: 72
-
-    —
-
-    🥉 #3 Краснодарский край  
-    • Полёты: 2 500  
-    • Длительность: 5 100 ч  
-    • Ср. время: 0.95 ч  
-    • Рост: +8% 🟢  
-    • Плотность: 72
-
-    —
-
-    🔥 #4 Новосибирская область  
-    • Полёты: 2 200  
-    • Длительность: 5 100 ч  
-    • Ср. время: 0.95 ч  
-    • Рост: +15% 🟢  
-    • Плотность: 72
-
-    —
-
-    📍 #5 Свердловская область  
-    • Полёты: 2 000  
-    • Длительность: 5 100 ч  
-    • Ср. время: 0.95 ч  
-    • Рост: -3% 🔴  
-    • Плотность: 72
-
-    —
-
-    📌 #6 Санкт-Петербург  
-    • Полёты: 1 900  
-    • Длительность: 5 100 ч  
-    • Ср. время: 0.95 ч  
-    • Рост: +10% 🟢  
-    • Плотность: 72
-
-    —
-
-    🎯 #7 Казань  
-    • Полёты: 1 800  
-    • Длительность: 5 100 ч  
-    • Ср. время: 0.95 ч  
-    • Рост: +7% 🟢  
-    • Плотность: 72
-
-    —
-
-    📈 #8 Самарская область  
-    • Полёты: 1 750  
-    • Длительность: 5 100 ч  
-    • Ср. время: 0.95 ч  
-    • Рост: -2% 🔴  
-    • Плотность: 72
-
-    —
-
-    📊 #9 Пермская область  
-    • Полёты: 1 700  
-    • Длительность: 5 100 ч  
-    • Ср. время: 0.95 ч  
-    • Рост: +9% 🟢  
-    • Плотность: 72
-
-    —
-
-    🌐 #10 Пермская область  
-    • Полёты: 1 680  
-    • Длительность: 5 100 ч  
-    • Ср. время: 0.95 ч  
-    • Рост: +9% 🟢  
-    • Плотность: 72
-
-    —
-
-    🌐 #11 Пермская область  
-    • Полёты: 1 670  
-    • Длительность: 5 100 ч  
-    • Ср. время: 0.95 ч  
-    • Рост: +9% 🟢  
-    • Плотность: 72
-
-    —
-
-    🌐 #12 Пермская область  
-    • Полёты: 1 640  
-    • Длительность: 5 100 ч  
-    • Ср. время: 0.95 ч  
-    • Рост: +9% 🟢  
-    • Плотность: 72
-
-    —
-
-    🌐 #13 Пермская область  
-    • Полёты: 1 600  
-    • Длительность: 5 100 ч  
-    • Ср. время: 0.95 ч  
-    • Рост: +9% 🟢  
-    • Плотность: 72
-
-    —
-
-    🌐 #14 Пермская область  
-    • Полёты: 1 550  
-    • Длительность: 5 100 ч  
-    • Ср. время: 0.95 ч  
-    • Рост: +9% 🟢  
-    • Плотность: 72
-
-    —
-
-    🌐 #15 Пермская область  
-    • Полёты: 1 490  
-    • Длительность: 5 100 ч  
-    • Ср. время: 0.95 ч  
-    • Рост: +9% 🟢  
-    • Плотность: 72"""
-
-    await callback_query.message.answer(text, parse_mode="HTML")
+    await callback_query.message.answer(format_regions_table())
     await callback_query.answer()
 
 
 @router.callback_query(F.data.startswith("export_json_"))
 async def export_region_json(callback_query: CallbackQuery):
     region_id = int(callback_query.data.split("_")[-1])
-    client = APIClient()
+    client = AsyncAPIClient()
     
     try:
-        stat_data = client.get_json_statistic(region_id)  
+        stat_data = await client.get_json_statistic(region_id)  
     except Exception as e:
         await callback_query.answer(f"Ошибка загрузки данных: {e}", show_alert=True)
         return
@@ -452,40 +321,42 @@ async def export_region_json(callback_query: CallbackQuery):
     await callback_query.answer()
 
 
-@router.callback_query(F.data.startswith("export_rf"))
-async def export_region_json(callback_query: CallbackQuery):
-    region_id = 24
-    client = APIClient()
-    
-    try:
-        stat_data = client.get_json_statistic(region_id)  
-    except Exception as e:
-        await callback_query.answer(f"Ошибка загрузки данных: {e}", show_alert=True)
+async def _send_rollup_report(callback_query: CallbackQuery, key: str, filename: str):
+    report = rollup.report(key)
+    if report is None:
+        await callback_query.answer("Данные ещё загружаются", show_alert=True)
         return
 
-    json_bytes = json.dumps(stat_data, ensure_ascii=False, indent=2).encode("utf-8")
-
-    
-    file = BufferedInputFile(
-        file=json_bytes,
-        filename=f"flight_statistics_rf.json"
-    )
-
-    
-
+    json_bytes = json.dumps(report, ensure_ascii=False, indent=2).encode("utf-8")
     await callback_query.message.answer_document(
-        document=file,
-        caption=f"📊 Экспорт данных по РФ"
+        document=BufferedInputFile(file=json_bytes, filename=filename),
+        caption=f"📊 Экспорт данных: {report['name']}"
     )
     await callback_query.answer()
 
+
+@router.callback_query(F.data.startswith("export_rf"))
+async def export_rf_json(callback_query: CallbackQuery):
+    await _send_rollup_report(callback_query, RF_KEY, "flight_statistics_rf.json")
+
+
+@router.callback_query(F.data.startswith("export_district_"))
+async def export_district_json(callback_query: CallbackQuery):
+    region_id = int(callback_query.data.split("_")[-1])
+    district = rollup.district_of(region_id)
+    if district is None:
+        await callback_query.answer("Федеральный округ региона не найден", show_alert=True)
+        return
+    await _send_rollup_report(callback_query, district.key, f"flight_statistics_district_{region_id}.json")
+
+
 @router.callback_query(F.data.startswith('trends_'))
 async def send_trend_chart(callback_query: CallbackQuery):
     loading_msg: Message = await callback_query.message.answer("📊 Собираю статистику...\nЭто может занять несколько секунд.")
-    client = APIClient()
-    region_id, type = int(callback_query.data.split('_')[1]), callback_query.data.split('_')[2]
-    region = client.get_region(region_id).get('data')
-    data = client.get_flights_by_type(type)
+    client = AsyncAPIClient()
+    region_id, type = callback_query.data.split('_')[1], callback_query.data.split('_')[2]
+    region_id = int(region_id) if region_id.isdigit() else region_id
+    data = await client.get_flights_by_type(type, region_id)
 
     await callback_query.message.answer_photo(data['photo'], caption=data['text'], reply_markup=get_organizations(region_id, type))
     await callback_query.answer()
@@ -496,16 +367,16 @@ async def send_trend_chart(callback_query: CallbackQuery):
 async def send_trend_chart_report(callback_query: CallbackQuery):
     loading_msg: Message = await callback_query.message.answer("📊 Собираю статистику...\nЭто может занять несколько секунд.")
     region_id, type_report = callback_query.data.replace('export_trends_', '').split('_')
-    client = APIClient()
+    client = AsyncAPIClient()
 
-    region = client.get_region(int(region_id)).get('data')
-    name = region.get('fullname')
-
-    try:
-        stat_data = client.get_json_statistic(region_id)  
-    except Exception as e:
-        await callback_query.answer(f"Ошибка загрузки данных: {e}", show_alert=True)
-        return
+    if not region_id.isdigit():
+        stat_data = rollup.report(region_id)
+    else:
+        try:
+            stat_data = await client.get_json_statistic(region_id)  
+        except Exception as e:
+            await callback_query.answer(f"Ошибка загрузки данных: {e}", show_alert=True)
+            return
 
     json_bytes = json.dumps(stat_data, ensure_ascii=False, indent=2).encode("utf-8")
 
@@ -532,20 +403,61 @@ async def send_trend_chart_report(callback_query: CallbackQuery):
 
 @router.callback_query(F.data == "show_top_regions")
 async def show_top_regions(callback_query: CallbackQuery):
-    client = APIClient()
+    client = AsyncAPIClient()
     top_names = [
-        "Москва",
-        "Татарстан",
-        "Краснодарский край",
-        "Новосибирская область",
-        "Свердловская область",
-        "Санкт-Петербург",
-        "Казань",
-        "Самарская область",
-        "Пермская область",
-        "Челябинская область"
+        (catalog.get_region(region_id) or {}).get('fullname', f"ID {region_id}")
+        for region_id in get_top_10_by_total()
     ]
 
     text = client.format_top_regions_names_with_emojis(top_names)
     await callback_query.message.answer(text, parse_mode="HTML")
-    await callback_query.answer()
\ No newline at end of file
+    await callback_query.answer()
+
+
+@router.callback_query(F.data.startswith('range_'))
+async def send_range_stats(callback_query: CallbackQuery):
+    region_id, days = map(int, callback_query.data.split('_')[1:])
+    date_from, date_to = range_window(region_id, days)
+    name = (catalog.get_region(region_id) or {}).get('fullname')
+    await callback_query.message.answer(
+        format_range_stats(region_id, date_from, date_to, name),
+        reply_markup=get_range_menu(region_id)
+    )
+    await callback_query.answer()
+
+
+@router.message(Command("range"))
+async def range_command(message: Message, command: CommandObject):
+    usage = "Использование: /range Регион ГГГГ-ММ-ДД ГГГГ-ММ-ДД\nНапример: /range Красноярский_край 2025-04-01 2025-06-30"
+    args = (command.args or "").split()
+    if len(args) < 3:
+        await message.answer(usage)
+        return
+    try:
+        date_from, date_to = date.fromisoformat(args[-2]), date.fromisoformat(args[-1])
+    except ValueError:
+        await message.answer(usage)
+        return
+
+    query = " ".join(args[:-2]).replace("_", " ")
+    region = catalog.get_region(query) if query.isdigit() else catalog.find_region_by_name(query)
+    if region is None:
+        await message.answer(f"Регион «{query}» не найден")
+        return
+    if date_from > date_to:
+        date_from, date_to = date_to, date_from
+    await message.answer(format_range_stats(region['id'], date_from, date_to, region.get('fullname')))
+
+
+@router.callback_query(F.data.startswith('cities_'))
+async def send_region_cities(callback_query: CallbackQuery):
+    region_id = int(callback_query.data.split('_')[1])
+    region = catalog.get_region(region_id)
+    if region is None:
+        await callback_query.answer("Регион не найден", show_alert=True)
+        return
+    await callback_query.message.answer(
+        format_region_cities(region, catalog.get_region_cities(region_id)),
+        reply_markup=get_region_menu(region_id)
+    )
+    await callback_query.answer()
@@ -0,0 +1,75 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from aiogram.types import InlineQueryResultArticle, InputTextMessageContent
+from configuration.config import INLINE_CACHE_SIZE, INLINE_CACHE_TTL, INLINE_PAGE_SIZE
+from infrastructure.api_clients.cache import TTLCache
+from infrastructure.api_clients.catalog import catalog
+from infrastructure.api_clients.search import SearchHit, fold
+
+
+def region_result(region: Dict, compare_with: Optional[int] = None) -> InlineQueryResultArticle:
+    capital_name = region["capital"]["name"] if region.get("capital") else "Нет столицы"
+    if compare_with is not None:
+        message_text = f"/compare_region_{region['id']}_{compare_with}"
+    else:
+        message_text = f"Вы выбрали регион: {region['fullname']}\nСтолица: {capital_name}"
+    return InlineQueryResultArticle(
+        id=f"{region['id']}",
+        title=region["fullname"],
+        description=f"Столица: {capital_name}",
+        input_message_content=InputTextMessageContent(message_text=message_text),
+    )
+
+
+def city_result(city: Dict) -> InlineQueryResultArticle:
+    region = catalog.get_city_region(city)
+    description = f"Город, {region['fullname']}" if region else "Город"
+    return InlineQueryResultArticle(
+        id=f"city_{city['id']}",
+        title=city["name"],
+        description=description,
+        input_message_content=InputTextMessageContent(message_text=f"Вы выбрали город: {city['name']}"),
+    )
+
+
+@dataclass(slots=True)
+class _ResultPages:
+    hits: List[SearchHit]
+    compare_with: Optional[int]
+    pages: Dict[int, List[InlineQueryResultArticle]] = field(default_factory=dict)
+
+    def page(self, offset: int) -> List[InlineQueryResultArticle]:
+        # статьи собираются только для запрошенной страницы и дальше переиспользуются
+        if offset not in self.pages:
+            self.pages[offset] = [
+                city_result(hit.item) if hit.kind == "city" else region_result(hit.item, self.compare_with)
+                for hit in self.hits[offset:offset + INLINE_PAGE_SIZE]
+            ]
+        return self.pages[offset]
+
+
+class InlineResultCache:
+    # ключ содержит версию справочника, поэтому после его обновления старые страницы просто вытесняются
+    def __init__(self, max_size: int = INLINE_CACHE_SIZE, ttl: float = INLINE_CACHE_TTL):
+        self._cache = TTLCache(max_size=max_size, stale_ttl=0)
+        self.ttl = ttl
+
+    def page(self, term: str, offset: int = 0, compare_with: Optional[int] = None) -> Tuple[List[InlineQueryResultArticle], str]:
+        key = (catalog.version, compare_with, fold(term))
+        pages = self._cache.get(key)
+        if pages is None:
+            hits = catalog.search(term, limit=None)
+            if compare_with is not None:
+                hits = [hit for hit in hits if hit.kind == "region"]
+            pages = _ResultPages(hits, compare_with)
+            self._cache.set(key, pages, self.ttl)
+
+        results = pages.page(offset)
+        next_offset = offset + INLINE_PAGE_SIZE
+        return results, str(next_offset) if next_offset < len(pages.hits) else ""
+
+    def stats(self) -> Dict[str, int]:
+        return self._cache.stats()
+
+
+inline_results = InlineResultCache()
@@ -1,5 +1,5 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from utils import REGIONS
+from utils import REGIONS, RANGE_PERIODS
 
 
 def get_main_kb():
@@ -8,7 +8,7 @@ def get_main_kb():
                 [InlineKeyboardButton(text="🔎 Найти регион", switch_inline_query_current_chat="")],
                 [
                     InlineKeyboardButton(text="🌍 Топ-10 регионов", callback_data="show_top_regions"),
-                    InlineKeyboardButton(text="📈 Динамика 2025", callback_data="trends_24_all")
+                    InlineKeyboardButton(text="📈 Динамика по РФ", callback_data="trends_rf_all")
                 ],
                 [
                     InlineKeyboardButton(text="📄 Отчёт по РФ", callback_data="export_rf"),
@@ -31,7 +31,14 @@ def get_region_menu(region_id: int):
                     InlineKeyboardButton(text="📄 Экспорт статистики региона", callback_data=f"export_json_{region_id}"),
                     InlineKeyboardButton(text="🛠 Применение БАС", callback_data=f"usebas_{region_id}")
                 ],
-                [InlineKeyboardButton(text="🛫 Последние полёты в регионе", callback_data=f"last_flights_{region_id}")]
+                [
+                    InlineKeyboardButton(text="🛫 Последние полёты в регионе", callback_data=f"last_flights_{region_id}"),
+                    InlineKeyboardButton(text="🗺 Отчёт по округу", callback_data=f"export_district_{region_id}")
+                ],
+                [
+                    InlineKeyboardButton(text="📆 Полёты за период", callback_data=f"range_{region_id}_30"),
+                    InlineKeyboardButton(text="🏙 Города региона", callback_data=f"cities_{region_id}")
+                ]
             ]
         )
     return kb
@@ -58,3 +65,21 @@ def get_organizations(region_id: int, type_report: str = 'all'):
 
     ]
     return InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
+
+
+def get_range_menu(region_id: int):
+    inline_keyboard = [
+        [
+            InlineKeyboardButton(text=f"{days} дн.", callback_data=f"range_{region_id}_{days}")
+            for days in RANGE_PERIODS
+        ]
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
+
+
+def get_region_matches(region_ids: list, names: list):
+    inline_keyboard = [
+        [InlineKeyboardButton(text=name, callback_data=f"region_{region_id}")]
+        for region_id, name in zip(region_ids, names)
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
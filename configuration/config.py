@@ -6,3 +6,37 @@ load_dotenv()
 
 TOKEN = os.getenv("BOT_TOKEN", "")
 API_BASE_URL = os.getenv("API_BASE_URL", "")
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "100"))
+API_TIMEOUT = float(os.getenv("API_TIMEOUT", "30"))
+API_PAGE_CONCURRENCY = int(os.getenv("API_PAGE_CONCURRENCY", "8"))
+API_PAGE_RETRIES = int(os.getenv("API_PAGE_RETRIES", "3"))
+API_PER_PAGE_CANDIDATES = [int(v) for v in os.getenv("API_PER_PAGE_CANDIDATES", "1000,500,200,100").split(",")]
+CACHE_MAX_SIZE = int(os.getenv("CACHE_MAX_SIZE", "2048"))
+CACHE_STALE_TTL = float(os.getenv("CACHE_STALE_TTL", "86400"))
+CACHE_TTL_REGION = float(os.getenv("CACHE_TTL_REGION", "21600"))
+CACHE_TTL_STATISTICS = float(os.getenv("CACHE_TTL_STATISTICS", "3600"))
+API_FLIGHT_PREFETCH = int(os.getenv("API_FLIGHT_PREFETCH", "4"))
+CATALOG_SNAPSHOT_PATH = os.getenv("CATALOG_SNAPSHOT_PATH", "data/catalog.json.gz")
+API_STATISTICS_FANOUT = int(os.getenv("API_STATISTICS_FANOUT", "16"))
+REFRESH_CATALOG_INTERVAL = float(os.getenv("REFRESH_CATALOG_INTERVAL", "21600"))
+CATALOG_MAX_AGE = float(os.getenv("CATALOG_MAX_AGE", "86400"))
+REFRESH_STATISTICS_INTERVAL = float(os.getenv("REFRESH_STATISTICS_INTERVAL", "3600"))
+REFRESH_JITTER = float(os.getenv("REFRESH_JITTER", "0.1"))
+REFRESH_CONCURRENCY = int(os.getenv("REFRESH_CONCURRENCY", "2"))
+STATS_LOG_INTERVAL = float(os.getenv("STATS_LOG_INTERVAL", "3600"))
+FLIGHT_STORE_DIR = os.getenv("FLIGHT_STORE_DIR", "data/flights")
+FLIGHT_STORE_FLUSH_ROWS = int(os.getenv("FLIGHT_STORE_FLUSH_ROWS", "50000"))
+FLIGHT_SYNC_INTERVAL = float(os.getenv("FLIGHT_SYNC_INTERVAL", "86400"))
+FLIGHT_SYNC_OVERLAP_DAYS = int(os.getenv("FLIGHT_SYNC_OVERLAP_DAYS", "3"))
+FLIGHT_SYNC_CONCURRENCY = int(os.getenv("FLIGHT_SYNC_CONCURRENCY", "4"))
+INLINE_PAGE_SIZE = int(os.getenv("INLINE_PAGE_SIZE", "50"))
+INLINE_CACHE_SIZE = int(os.getenv("INLINE_CACHE_SIZE", "1024"))
+INLINE_CACHE_TTL = int(os.getenv("INLINE_CACHE_TTL", "3600"))
+SPATIAL_CELL_DEG = float(os.getenv("SPATIAL_CELL_DEG", "1.0"))
+CITY_MATCH_MAX_KM = float(os.getenv("CITY_MATCH_MAX_KM", "50"))
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "2"))
+RENDER_QUEUE_LIMIT = int(os.getenv("RENDER_QUEUE_LIMIT", "16"))
+RENDER_TIMEOUT = float(os.getenv("RENDER_TIMEOUT", "30"))
+CHART_CACHE_DIR = os.getenv("CHART_CACHE_DIR", "data/charts")
+CHART_CACHE_MEMORY_BYTES = int(os.getenv("CHART_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+CHART_CACHE_DISK_BYTES = int(os.getenv("CHART_CACHE_DISK_BYTES", str(512 * 1024 * 1024)))
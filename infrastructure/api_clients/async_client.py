@@ -0,0 +1,371 @@
+import asyncio
+import aiohttp
+from collections import deque
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+from configuration.config import (
+    API_BASE_URL,
+    API_POOL_SIZE,
+    API_TIMEOUT,
+    API_PAGE_CONCURRENCY,
+    API_PAGE_RETRIES,
+    API_PER_PAGE_CANDIDATES,
+    API_FLIGHT_PREFETCH,
+    API_STATISTICS_FANOUT,
+    CACHE_TTL_REGION,
+    CACHE_TTL_STATISTICS
+)
+from .cache import response_cache
+from .catalog import catalog
+from .city_client import BaseAPIClient
+from .singleflight import upstream_calls
+from .models import Statistic
+
+
+API_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+_session: Optional[aiohttp.ClientSession] = None
+_per_page_by_url: Dict[str, int] = {}
+
+
+def get_session() -> aiohttp.ClientSession:
+    # Один пул соединений на процесс: создаётся лениво внутри работающего event loop.
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=API_POOL_SIZE, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=API_TIMEOUT)
+        )
+    return _session
+
+
+async def close_session():
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+def _encode_params(params: Optional[dict]) -> List[Tuple[str, str]]:
+    # aiohttp не разворачивает списки (regions[]), в отличие от requests
+    encoded = []
+    for key, value in (params or {}).items():
+        if isinstance(value, (list, tuple)):
+            encoded.extend((key, str(v)) for v in value)
+        elif value is not None:
+            encoded.append((key, str(value)))
+    return encoded
+
+
+class AsyncAPIClient(BaseAPIClient):
+    def __init__(self, base_url: str = API_BASE_URL, page_concurrency: int = API_PAGE_CONCURRENCY):
+        super().__init__(base_url)
+        self.page_concurrency = page_concurrency
+
+    async def _request_json(self, url: str, query: List[Tuple[str, str]]) -> Dict:
+        session = get_session()
+        async with session.get(url, params=query) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def get_raw(
+        self,
+        url: str,
+        params: Optional[dict] = None,
+        headers: Optional[Dict[str, str]] = None
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        session = get_session()
+        async with session.get(url, params=_encode_params(params), headers=headers) as response:
+            if response.status != 304:
+                response.raise_for_status()
+            return response.status, dict(response.headers), await response.read()
+
+    async def _get_json(self, url: str, params: Optional[dict] = None) -> Dict:
+        query = _encode_params(params)
+        return await upstream_calls.do((url, tuple(query)), lambda: self._request_json(url, query))
+
+    async def _get_cached(self, url: str, ttl: float, params: Optional[dict] = None) -> Dict:
+        key = (url, tuple(_encode_params(params)))
+        return await response_cache.get_or_load(key, lambda: self._get_json(url, params), ttl)
+
+    def _per_page_candidates(self, url: str) -> List[int]:
+        if url in _per_page_by_url:
+            return [_per_page_by_url[url]]
+        return sorted(API_PER_PAGE_CANDIDATES, reverse=True)
+
+    async def _fetch_page(self, url: str, params: Optional[dict], page: int, per_page: int) -> Dict:
+        request_params = dict(params or {}, page=page, per_page=per_page)
+        for attempt in range(API_PAGE_RETRIES + 1):
+            try:
+                return await self._get_json(url, request_params)
+            except aiohttp.ClientResponseError as e:
+                if (400 <= e.status < 500 and e.status != 429) or attempt == API_PAGE_RETRIES:
+                    raise
+            except API_ERRORS:
+                if attempt == API_PAGE_RETRIES:
+                    raise
+            await asyncio.sleep(0.5 * 2 ** attempt)
+
+    async def _fetch_first_page(self, url: str, params: Optional[dict]) -> Tuple[Dict, int]:
+        # Самый большой per_page, который принимает бэкенд; meta.per_page учитывает его собственный лимит
+        for per_page in self._per_page_candidates(url):
+            try:
+                data = await self._fetch_page(url, params, 1, per_page)
+            except aiohttp.ClientResponseError as e:
+                if e.status in (400, 422):
+                    continue
+                raise
+            accepted = int(data.get("meta", {}).get("per_page", per_page))
+            _per_page_by_url[url] = accepted
+            return data, accepted
+        raise aiohttp.ClientError(f"{url}: бэкенд не принял ни один размер страницы")
+
+    async def _get_paginated_data(self, url: str, params: Optional[dict] = None) -> List[Dict]:
+        first, per_page = await self._fetch_first_page(url, params)
+        all_items = list(first.get("data", []))
+        last_page = first.get("meta", {}).get("last_page", 1)
+        if last_page <= 1:
+            return all_items
+
+        semaphore = asyncio.Semaphore(self.page_concurrency)
+
+        async def fetch(page: int) -> Dict:
+            async with semaphore:
+                return await self._fetch_page(url, params, page, per_page)
+
+        tasks = [asyncio.ensure_future(fetch(page)) for page in range(2, last_page + 1)]
+        try:
+            pages = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        for data in pages:
+            all_items.extend(data.get("data", []))
+        return all_items
+
+    async def _get_all(self, url: str, params: Optional[dict] = None) -> List[Dict]:
+        try:
+            return await self._get_paginated_data(url, params)
+        except API_ERRORS as e:
+            print(f"[API Error] Ошибка при получении данных с {url}: {e}")
+            return []
+
+    async def get_cities(self, page: int = 1, per_page: int = 100) -> Optional[Dict]:
+        try:
+            return await self._get_json(f"{self.base_url}/city", {"page": page, "per_page": per_page})
+        except API_ERRORS as e:
+            print(f"[API Error] Не удалось получить города: {e}")
+            return None
+
+    async def get_all_cities(self) -> List[Dict]:
+        return await self._get_all(f"{self.base_url}/city")
+
+    async def find_city_by_name(self, name: str) -> Optional[Dict]:
+        await catalog.ensure_loaded(self)
+        return catalog.find_city_by_name(name)
+
+    async def get_regions(self, page: int = 1, per_page: int = 100) -> Optional[Dict]:
+        try:
+            return await self._get_json(f"{self.base_url}/region", {"page": page, "per_page": per_page})
+        except API_ERRORS as e:
+            print(f"[API Error] Не удалось получить регионы: {e}")
+            return None
+
+    async def get_all_regions(self) -> List[Dict]:
+        return await self._get_all(f"{self.base_url}/region")
+
+    async def get_region(self, id: int) -> Optional[Dict]:
+        try:
+            return await self._get_cached(f"{self.base_url}/region/{id}", CACHE_TTL_REGION)
+        except API_ERRORS as e:
+            print(f"[API Error] Не удалось получить регион: {e}")
+            return None
+
+    async def get_statistic_of_region(self, id: int) -> Optional[Dict]:
+        try:
+            statistic = await self._get_cached_statistic(id)
+        except API_ERRORS as e:
+            print(f"[API Error] Не удалось получить статистику: {e}")
+            return None
+
+        return {
+            'all_flights': statistic.total_flights_all,
+            'yur': statistic.total_flights_yur,
+            'fiz': statistic.total_flights_fiz,
+            'id': id,
+            'change_percent': "🔻 0%"
+        }
+
+    async def get_json_statistic(self, region_id: int) -> Optional[Dict]:
+        try:
+            report = await self._get_json(f"{self.base_url}/statistics/region/{region_id}")
+        except API_ERRORS as e:
+            print(f"[API Error] Не удалось получить статистику: {e}")
+            return None
+
+        allowed_keys = {"summary", "statistics"}
+        return {k: v for k, v in report.items() if k in allowed_keys}
+
+    async def _get_region_data(self, region_id) -> Dict:
+        # метаданные региона берём из справочника, в API идём только если его там нет
+        region = catalog.get_region(region_id)
+        if region is None:
+            region = (await self._get_cached(f"{self.base_url}/region/{region_id}", CACHE_TTL_REGION)).get('data')
+        return region
+
+    async def _load_statistic(self, region_id: int) -> Statistic:
+        report, region = await asyncio.gather(
+            self._get_json(f"{self.base_url}/statistics/region/{region_id}"),
+            self._get_region_data(region_id)
+        )
+        return self._build_statistic(region_id, (region or {}).get('fullname'), report)
+
+    def _statistic_key(self, region_id: int) -> Tuple:
+        return ("statistic", self.base_url, region_id)
+
+    async def _get_cached_statistic(self, region_id) -> Statistic:
+        # в кэше лежат разобранные Statistic со __slots__, а не сырые словари ответа
+        region_id = int(region_id)
+        return await response_cache.get_or_load(
+            self._statistic_key(region_id), lambda: self._load_statistic(region_id), CACHE_TTL_STATISTICS
+        )
+
+    async def get_statistic(self, region_id, fresh: bool = False) -> Optional[Statistic]:
+        try:
+            if fresh:
+                statistic = await self._load_statistic(int(region_id))
+                response_cache.set(self._statistic_key(statistic.id), statistic, CACHE_TTL_STATISTICS)
+                return statistic
+            return await self._get_cached_statistic(region_id)
+        except API_ERRORS as e:
+            print(f"[API Error] Не удалось получить статистику: {e}")
+            return None
+
+    async def get_statistics_many(
+        self,
+        region_ids: List[int],
+        concurrency: int = API_STATISTICS_FANOUT,
+        fresh: bool = False
+    ) -> List[Optional[Statistic]]:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(region_id) -> Optional[Statistic]:
+            async with semaphore:
+                return await self.get_statistic(region_id, fresh)
+
+        # сбой одного региона (битый JSON, неожиданный формат) не должен срывать обновление остальных
+        results = await asyncio.gather(*(fetch(region_id) for region_id in region_ids), return_exceptions=True)
+        statistics = []
+        for region_id, result in zip(region_ids, results):
+            if isinstance(result, Exception):
+                print(f"[API Error] Не удалось разобрать статистику региона {region_id}: {result!r}")
+                result = None
+            statistics.append(result)
+        return statistics
+
+    async def get_percent_up(self, region_id) -> Optional[Dict]:
+        try:
+            statistic = await self._get_cached_statistic(region_id)
+        except API_ERRORS as e:
+            print(f"[API Error] Не удалось получить статистику: {e}")
+            return None
+
+        return self._percent_up(statistic)
+
+    async def find_region_by_name(self, name: str) -> Optional[Dict]:
+        await catalog.ensure_loaded(self)
+        return catalog.find_region_by_name(name)
+
+    async def find_region_by_code(self, code: str) -> Optional[Dict]:
+        await catalog.ensure_loaded(self)
+        return catalog.find_region_by_code(code)
+
+    async def get_flights(
+        self,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        region_ids: Optional[List[int]] = None,
+        page: int = 1,
+        per_page: int = 100
+    ) -> Optional[Dict]:
+        params = {"page": page, "per_page": per_page}
+        if date_from:
+            params["datefrom"] = date_from
+        if date_to:
+            params["dateto"] = date_to
+        if region_ids:
+            params["regions[]"] = region_ids
+
+        try:
+            return await self._get_json(f"{self.base_url}/flight", params)
+        except API_ERRORS as e:
+            print(f"[API Error] Не удалось получить полёты: {e}")
+            return None
+
+    def _flight_params(
+        self,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        region_ids: Optional[List[int]] = None
+    ) -> Dict:
+        params = {}
+        if date_from:
+            params["datefrom"] = date_from
+        if date_to:
+            params["dateto"] = date_to
+        if region_ids:
+            params["regions[]"] = region_ids
+        return params
+
+    async def get_all_flights(
+        self,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        region_ids: Optional[List[int]] = None
+    ) -> List[Dict]:
+        params = self._flight_params(date_from, date_to, region_ids)
+        return await self._get_all(f"{self.base_url}/flight", params)
+
+    async def iter_flight_pages(
+        self,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        region_ids: Optional[List[int]] = None,
+        prefetch: int = API_FLIGHT_PREFETCH
+    ) -> AsyncIterator[List[Dict]]:
+        # Страницы отдаются по порядку; вперёд качается не больше prefetch страниц,
+        # новые запросы ставятся только когда потребитель забирает очередную страницу.
+        url = f"{self.base_url}/flight"
+        params = self._flight_params(date_from, date_to, region_ids)
+        first, per_page = await self._fetch_first_page(url, params)
+        last_page = first.get("meta", {}).get("last_page", 1)
+        next_page = 2
+        pending = deque()
+        try:
+            yield first.get("data", [])
+            while pending or next_page <= last_page:
+                while next_page <= last_page and len(pending) < max(prefetch, 1):
+                    pending.append(asyncio.ensure_future(self._fetch_page(url, params, next_page, per_page)))
+                    next_page += 1
+                data = await pending.popleft()
+                yield data.get("data", [])
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def iter_flights(
+        self,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        region_ids: Optional[List[int]] = None,
+        prefetch: int = API_FLIGHT_PREFETCH
+    ) -> AsyncIterator[Dict]:
+        pages = self.iter_flight_pages(date_from, date_to, region_ids, prefetch)
+        try:
+            async for page in pages:
+                for flight in page:
+                    yield flight
+        finally:
+            await pages.aclose()
+
@@ -0,0 +1,102 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from configuration.config import CACHE_MAX_SIZE, CACHE_STALE_TTL
+
+
+@dataclass(slots=True)
+class _Entry:
+    value: Any
+    expires_at: float
+    stale_until: float
+
+
+class TTLCache:
+    def __init__(self, max_size: int = CACHE_MAX_SIZE, stale_ttl: float = CACHE_STALE_TTL):
+        self.max_size = max_size
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._refreshing: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refresh_errors = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def set(self, key: Hashable, value: Any, ttl: float, stale_ttl: Optional[float] = None):
+        now = time.monotonic()
+        stale_ttl = self.stale_ttl if stale_ttl is None else stale_ttl
+        self._entries[key] = _Entry(value, now + ttl, now + ttl + stale_ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: float,
+        stale_ttl: Optional[float] = None
+    ) -> Any:
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None and now < entry.stale_until:
+            self._entries.move_to_end(key)
+            if now < entry.expires_at:
+                self.hits += 1
+            else:
+                # stale-while-revalidate: отдаём старое значение, обновляем в фоне
+                self.stale_hits += 1
+                if key not in self._refreshing:
+                    self._refreshing[key] = asyncio.create_task(self._refresh(key, loader, ttl, stale_ttl))
+            return entry.value
+
+        self.misses += 1
+        value = await loader()
+        self.set(key, value, ttl, stale_ttl)
+        return value
+
+    async def _refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: float, stale_ttl: Optional[float]):
+        try:
+            self.set(key, await loader(), ttl, stale_ttl)
+        except Exception as e:
+            self.refresh_errors += 1
+            print(f"[Cache] Не удалось обновить {key}: {e}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "refreshing": len(self._refreshing),
+            "refresh_errors": self.refresh_errors
+        }
+
+
+response_cache = TTLCache()
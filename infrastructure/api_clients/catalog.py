@@ -0,0 +1,285 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from configuration.config import CATALOG_MAX_AGE, CATALOG_SNAPSHOT_PATH
+from .fuzzy import ABBREVIATIONS, FuzzyIndex, FuzzyMatch
+from .search import SearchHit, SearchIndex
+
+
+SNAPSHOT_VERSION = 1
+ENDPOINTS = {"regions": "/region", "cities": "/city"}
+REGION_NAME_KEYS = ("name", "fullname", "name_en")
+REGION_CODE_KEYS = ("code", "iso_3166-2", "okato", "oktmo")
+CITY_KEYS = ("name", "name_alt", "name_en", "okato", "oktmo")
+FUZZY_REGION_KEYS = ("name", "fullname", "name_en")
+
+
+def normalize(value) -> str:
+    return str(value).strip().lower().replace("ё", "е")
+
+
+def _build_index(items: List[Dict], keys) -> Dict[str, Dict]:
+    index = {}
+    for item in items:
+        for key in keys:
+            value = item.get(key)
+            if value:
+                # при совпадении ключей выигрывает первая запись, как при линейном поиске
+                index.setdefault(normalize(value), item)
+    return index
+
+
+def _code_prefix(code) -> Optional[str]:
+    # 71100000000 -> "711"; у регионов с кодом вида 10000000000 значимы первые две цифры
+    digits = str(code or "").strip()
+    if not digits.isdigit():
+        return None
+    prefix = digits.rstrip("0")
+    return prefix if len(prefix) >= 2 else digits[:2]
+
+
+def _population(item: Dict) -> int:
+    value = str(item.get("population") or "")
+    return int(value) if value.isdigit() else 0
+
+
+def _join_cities(regions: List[Dict], cities: List[Dict]) -> Tuple[Dict[int, Dict], Dict[int, List[Dict]]]:
+    # Город относится к региону с самым длинным префиксом ОКТМО, затем ОКАТО: в ОКТМО ХМАО (718) и ЯНАО (719)
+    # отделены от Тюменской области (71), а НАО (118) — от Архангельской (11). В ОКАТО города ЯНАО (7117…)
+    # попадают под префикс ХМАО (711), поэтому он только запасной.
+    prefixes = {
+        key: {prefix: region for region in regions if (prefix := _code_prefix(region.get(key)))}
+        for key in ("oktmo", "okato")
+    }
+    # столица — последний вариант и только если на город претендует один регион: Тюмень указана
+    # столицей у трёх регионов, Архангельск — у двух, а Москва — у Московской области, хотя по коду это регион 77
+    claims: Dict[int, List[Dict]] = {}
+    for region in regions:
+        capital_id = (region.get("capital") or {}).get("id")
+        if capital_id:
+            claims.setdefault(capital_id, []).append(region)
+    capitals = {city_id: claimed[0] for city_id, claimed in claims.items() if len(claimed) == 1}
+
+    city_regions = {}
+    for city in cities:
+        region = None
+        for key in ("oktmo", "okato"):
+            code = str(city.get(key) or "")
+            for length in range(len(code), 1, -1):
+                if region is not None:
+                    break
+                region = prefixes[key].get(code[:length])
+        if region is None:
+            region = capitals.get(city["id"])
+        if region is not None:
+            city_regions[city["id"]] = region
+
+    region_cities = {region["id"]: [] for region in regions}
+    for city in sorted(cities, key=_population, reverse=True):
+        region = city_regions.get(city["id"])
+        if region is not None:
+            region_cities[region["id"]].append(city)
+    return city_regions, region_cities
+
+
+@dataclass(slots=True, frozen=True)
+class _CatalogData:
+    regions: List[Dict] = field(default_factory=list)
+    cities: List[Dict] = field(default_factory=list)
+    regions_by_id: Dict[int, Dict] = field(default_factory=dict)
+    cities_by_id: Dict[int, Dict] = field(default_factory=dict)
+    city_regions: Dict[int, Dict] = field(default_factory=dict)
+    region_cities: Dict[int, List[Dict]] = field(default_factory=dict)
+    region_names: Dict[str, Dict] = field(default_factory=dict)
+    region_codes: Dict[str, Dict] = field(default_factory=dict)
+    city_index: Dict[str, Dict] = field(default_factory=dict)
+    search_index: SearchIndex = field(default_factory=lambda: SearchIndex([], []))
+    fuzzy_index: FuzzyIndex = field(default_factory=lambda: FuzzyIndex([]))
+
+
+class Catalog:
+    def __init__(self):
+        self._data = _CatalogData()
+        self._lock = asyncio.Lock()
+        self.version = 0
+        self.updated_at: Optional[float] = None
+        self._validators: Dict[str, Dict[str, Optional[str]]] = {}
+
+    @property
+    def regions(self) -> List[Dict]:
+        return self._data.regions
+
+    @property
+    def cities(self) -> List[Dict]:
+        return self._data.cities
+
+    def is_loaded(self) -> bool:
+        return bool(self._data.regions)
+
+    def load(self, regions: List[Dict], cities: List[Dict]):
+        city_regions, region_cities = _join_cities(regions, cities)
+        data = _CatalogData(
+            regions=regions,
+            cities=cities,
+            regions_by_id={region["id"]: region for region in regions},
+            cities_by_id={city["id"]: city for city in cities},
+            city_regions=city_regions,
+            region_cities=region_cities,
+            region_names=_build_index(regions, REGION_NAME_KEYS),
+            region_codes=_build_index(regions, REGION_CODE_KEYS),
+            city_index=_build_index(cities, CITY_KEYS),
+            search_index=SearchIndex(regions, cities),
+            fuzzy_index=FuzzyIndex(
+                ((region, [region.get(key) for key in FUZZY_REGION_KEYS] + [(region.get("capital") or {}).get("name")])
+                 for region in regions),
+                ABBREVIATIONS
+            )
+        )
+        # индексы строятся целиком и подменяются одним присваиванием
+        self._data = data
+        self.version += 1
+        self.updated_at = time.time()
+
+    async def refresh(self, client, regions: bool = True, cities: bool = True) -> bool:
+        new_regions, new_cities = await asyncio.gather(
+            client.get_all_regions() if regions else asyncio.sleep(0, []),
+            client.get_all_cities() if cities else asyncio.sleep(0, [])
+        )
+        if not new_regions and not new_cities:
+            print("[Catalog] Не удалось обновить справочники, остаются прежние данные")
+            return False
+        self.load(new_regions or self._data.regions, new_cities or self._data.cities)
+        print(f"[Catalog] Загружено {len(self.regions)} регионов и {len(self.cities)} городов")
+        return True
+
+    async def _is_changed(self, client, name: str, max_age: float = CATALOG_MAX_AGE) -> bool:
+        # Условный GET первой страницы: ETag / Last-Modified, если бэкенд их отдаёт,
+        # иначе сравниваем sha256 тела (для /city в нём есть meta.total).
+        # Правки на дальних страницах так не видны, поэтому справочник старше max_age перезагружается целиком.
+        old = self._validators.get(name, {})
+        loaded_at = old.get("loaded_at", self.updated_at or 0)
+        expired = time.time() - loaded_at > max_age
+        headers = {}
+        if old.get("etag") and not expired:
+            headers["If-None-Match"] = old["etag"]
+        if old.get("last_modified") and not expired:
+            headers["If-Modified-Since"] = old["last_modified"]
+
+        status, response_headers, body = await client.get_raw(
+            f"{client.base_url}{ENDPOINTS[name]}", {"page": 1}, headers
+        )
+        if status == 304:
+            return False
+
+        digest = hashlib.sha256(body).hexdigest()
+        self._validators[name] = {
+            "etag": response_headers.get("ETag"),
+            "last_modified": response_headers.get("Last-Modified"),
+            "hash": digest,
+            "loaded_at": loaded_at
+        }
+        return expired or digest != old.get("hash")
+
+    async def revalidate(self, client, path: str = CATALOG_SNAPSHOT_PATH) -> bool:
+        names = list(ENDPOINTS)
+        results = await asyncio.gather(*(self._is_changed(client, name) for name in names), return_exceptions=True)
+        changed = set()
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                print(f"[Catalog] Не удалось проверить {ENDPOINTS[name]}: {result}")
+            elif result:
+                changed.add(name)
+
+        if not self.is_loaded():
+            changed.update(names)
+        if not changed:
+            print("[Catalog] Справочники не изменились")
+            return False
+
+        if not await self.refresh(client, regions="regions" in changed, cities="cities" in changed):
+            for name in changed:
+                self._validators.pop(name, None)
+            return False
+        for name in changed:
+            self._validators.setdefault(name, {})["loaded_at"] = time.time()
+        self.save_snapshot(path)
+        return True
+
+    def save_snapshot(self, path: str = CATALOG_SNAPSHOT_PATH):
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "saved_at": time.time(),
+            "validators": self._validators,
+            "regions": self._data.regions,
+            "cities": self._data.cities
+        }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        try:
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[Catalog] Не удалось сохранить снимок {path}: {e}")
+
+    def load_snapshot(self, path: str = CATALOG_SNAPSHOT_PATH) -> bool:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            print(f"[Catalog] Повреждён снимок {path}: {e}")
+            return False
+
+        if snapshot.get("version") != SNAPSHOT_VERSION or not snapshot.get("regions"):
+            return False
+        self._validators = snapshot.get("validators", {})
+        self.load(snapshot["regions"], snapshot.get("cities", []))
+        self.updated_at = snapshot.get("saved_at")
+        print(f"[Catalog] Снимок загружен: {len(self.regions)} регионов и {len(self.cities)} городов")
+        return True
+
+    async def ensure_loaded(self, client):
+        if self.is_loaded():
+            return
+        async with self._lock:
+            if not self.is_loaded():
+                await self.refresh(client)
+
+    def get_region(self, region_id) -> Optional[Dict]:
+        return self._data.regions_by_id.get(int(region_id))
+
+    def get_city(self, city_id) -> Optional[Dict]:
+        return self._data.cities_by_id.get(int(city_id))
+
+    def get_city_region(self, city: Dict) -> Optional[Dict]:
+        return self._data.city_regions.get(city.get("id"))
+
+    def get_region_cities(self, region_id) -> List[Dict]:
+        return self._data.region_cities.get(int(region_id), [])
+
+    def search(self, query: str, limit: Optional[int] = 50) -> List[SearchHit]:
+        return self._data.search_index.search(query, limit)
+
+    def match_region(self, query: str, limit: int = 5) -> List[FuzzyMatch]:
+        return self._data.fuzzy_index.match(query, limit)
+
+    def find_region_by_name(self, name: str) -> Optional[Dict]:
+        return self._data.region_names.get(normalize(name))
+
+    def find_region_by_code(self, code: str) -> Optional[Dict]:
+        return self._data.region_codes.get(normalize(code))
+
+    def find_city_by_name(self, name: str) -> Optional[Dict]:
+        return self._data.city_index.get(normalize(name))
+
+
+catalog = Catalog()
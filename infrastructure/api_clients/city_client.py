@@ -1,87 +1,22 @@
-import requests
-from typing import List, Dict, Optional, Union
+from typing import List, Dict, Optional, Tuple, Union
 from configuration.config import API_BASE_URL
-from .models import Statistic, YearStatistic
+from .models import MonthStatistic, Statistic, YearStatistic, duration_to_seconds
 from aiogram.types import BufferedInputFile, FSInputFile
 import numpy as np
 import json
-from datetime import datetime
+from datetime import date, timedelta
+from infrastructure.flight_store import flight_store
+from infrastructure.range_index import KINDS, range_index
+from infrastructure.rollup import rollup
 from infrastructure.gen_image import generate_flights_trend_chart
+from infrastructure.render import RenderError, render_service
 import os
 
 
-class APIClient:
+class BaseAPIClient:
     def __init__(self, base_url: str = API_BASE_URL):
         self.base_url = base_url.rstrip('/')
-        self.session = requests.Session()
 
-    def _get_paginated_data(self, url: str, params: Optional[dict] = None) -> List[Dict]:
-        all_items = []
-        page = 1
-        while True:
-            request_params = (params or {}).copy()
-            request_params['page'] = page
-            try:
-                response = self.session.get(url, params=request_params)
-                response.raise_for_status()
-                data = response.json()
-                if "data" not in data:
-                    break
-                all_items.extend(data["data"])
-                if page >= data["meta"]["last_page"]:
-                    break
-                page += 1
-            except requests.RequestException as e:
-                print(f"[API Error] Ошибка при получении данных с {url}: {e}")
-                break
-        return all_items
-    
-
-
-    def get_cities(self, page: int = 1, per_page: int = 100) -> Optional[Dict]:
-        url = f"{self.base_url}/city"
-        try:
-            response = self.session.get(url, params={"page": page, "per_page": per_page})
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            print(f"[API Error] Не удалось получить города: {e}")
-            return None
-
-    def get_all_cities(self) -> List[Dict]:
-        return self._get_paginated_data(f"{self.base_url}/city")
-
-    def find_city_by_name(self, name: str) -> Optional[Dict]:
-        name_lower = name.strip().lower()
-        for city in self.get_all_cities():
-            if city["name"].lower() == name_lower:
-                return city
-        return None
-
-    def get_regions(self, page: int = 1, per_page: int = 100) -> Optional[Dict]:
-        url = f"{self.base_url}/region"
-        try:
-            response = self.session.get(url, params={"page": page, "per_page": per_page})
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            print(f"[API Error] Не удалось получить регионы: {e}")
-            return None
-
-    def get_all_regions(self) -> List[Dict]:
-        return self._get_paginated_data(f"{self.base_url}/region")
-
-    def get_region(self, id: int) -> Dict:
-        url = f"{self.base_url}/region/{id}"
-        try:
-            response = self.session.get(url)
-            response.raise_for_status()
-            print(response.json())
-            return response.json()
-        except requests.RequestException as e:
-            print(f"[API Error] Не удалось получить города: {e}")
-            return None
-        
     def _calculate_flight_change(self, current: int, previous: int) -> float:
         if previous == 0:
             if current == 0:
@@ -92,189 +27,74 @@ class APIClient:
         if percent >= 0:
             return f"🔺 {round(percent, 2)}%"
         return f"🔻 {round(percent, 2)}%"
-    
+
     def _parse_by_year_and_months(self, months) -> List[int]:
         counts = []
         for i in months:
             counts.append(i.get('flight_count'))
         return counts
 
-    def get_statistic_of_region(self, id: int) -> Dict:
-        url = f"{self.base_url}/statistics/region/{id}"
-        data = {}
-        try:
-            response = self.session.get(url)
-            response.raise_for_status()
-
-            statistic = response.json().get('statistics')
-            summary = response.json().get('summary')
-            by_year = statistic.get('by_year')
-            by_year_and_month = statistic.get('by_year_and_month')
-            total_flights = summary.get('total_flights')
-            data['all_flights'] = total_flights.get('all')
-            data['yur'] = total_flights.get('yur')
-            data['fiz'] = total_flights.get('fiz')
-            
-            
-            # data['last_year'] = by_year[-1] if len(by_year) > 0 else []
-            # data['by_year'] = by_year
-            data['id'] = id
-            data['change_percent'] = "🔻 0%"
-            return data
-        except requests.RequestException as e:
-            print(f"[API Error] Не удалось получить города: {e}")
-            return None
-        
-    def get_json_statistic(self, region_id: int):
-        url = f"{self.base_url}/statistics/region/24"
-        data = {}
-        try:
-            response = self.session.get(url)
-            response.raise_for_status()
-            report = response.json()
-
-            if "region" in report:
-                del report["region"]
-
-            allowed_keys = {"summary", "statistics"}
-            filtered = {k: v for k, v in report.items() if k in allowed_keys}
-
-            return filtered
-        
-
-        except requests.RequestException as e:
-            print(f"[API Error] Не удалось получить города: {e}")
-            return None
-        
-
-    def get_statistic(self, region_id):
-        url_stat = f"{self.base_url}/statistics/region/{region_id}"
-        url_region = f"{self.base_url}/region/{region_id}"
-        try:
-            response_stat = self.session.get(url_stat)
-            response_reg = self.session.get(url_region)
-            response_stat.raise_for_status()
-            response_reg.raise_for_status()
-
-            statistic = response_stat.json().get('statistics')
-            by_year = statistic.get('by_year')
-
-            all_flights_years = self._parse_years(by_year.get('all'))
-            fiz_flights_years = self._parse_years(by_year.get('fiz'))
-            yur_flights_years = self._parse_years(by_year.get('yur'))
-            
-            summary = response_stat.json().get('summary')
-            total_flights_all = summary.get('total_flights').get('all')
-            total_flights_yur = summary.get('total_flights').get('yur')
-            total_flights_fiz = summary.get('total_flights').get('fiz')
-            name = response_reg.json().get('data').get('fullname')
-            
-            region_statistic = Statistic(
-                id=region_id,
-                name=name,
-                total_flights_all=total_flights_all,
-                total_flights_yur=total_flights_yur,
-                total_flights_fiz=total_flights_fiz,
-                all_flights_years=all_flights_years,
-                fiz_flights_years=fiz_flights_years,
-                yur_flights_years=yur_flights_years
-            )
-            
-            return region_statistic
-
-        except requests.RequestException as e:
-            print(f"[API Error] Не удалось получить города: {e}")
-            return None
-    
-    def get_flights_by_type(self, entity_type: str):
-        base_trend = []
-        total_monthly = 231
-        for i in range(1, 32):
-            raw = 1.0 + 0.3 * np.sin(i / 4) + 0.1 * np.random.randn()
-            raw = max(0.1, raw) 
-            base_trend.append({"date": f"2025-07-{i:02d}", "flights": 0})
-
-        raw_sum = sum(1.0 + 0.3 * np.sin(i / 4) + 0.1 * np.random.randn() for i in range(1, 32))
-        for i in range(31):
-            val = (1.0 + 0.3 * np.sin((i + 1) / 4) + 0.1 * np.random.randn()) / raw_sum * total_monthly
-            base_trend[i]["flights"] = int(max(0, round(val)))
-
-        actual_sum = sum(d["flights"] for d in base_trend)
-        diff = total_monthly - actual_sum
-        if abs(diff) > 0 and base_trend:
-            base_trend[-1]["flights"] = max(0, base_trend[-1]["flights"] + diff)
-
-        data = {}
-
-        if entity_type == "all":
-            fl_trend = []
-            ul_trend = []
-            for day in base_trend:
-                total = day["flights"]
-                fl = int(total * 0.6 + np.random.randint(-2, 3))
-                fl = max(0, min(fl, total))
-                ul = total - fl
-                fl_trend.append({"date": day["date"], "flights": fl})
-                ul_trend.append({"date": day["date"], "flights": ul})
-
-            stats = {
-                "avg_time": "12",
-                "growth_ratio": "9,7%",
-                "total_flights": sum(d["flights"] for d in base_trend)
-            }
-
-            # image_bytes = generate_flights_trend_chart(base_trend, stats)
-            # photo = BufferedInputFile(image_bytes, filename="trend_all.png")
-            
-
+    def _trend_source(self, region_id: Union[int, str]):
+        # числовой id — регион из индекса префиксных сумм, иначе узел свёртки ("rf", "district:...")
+        if isinstance(region_id, str) and not region_id.isdigit():
+            node = rollup.get(region_id)
+            return node.aggregate if node else None
+        return range_index.get(int(region_id))
+
+    def _trend_window(self, region_id: Union[int, str], days: int = 31) -> Tuple[date, date]:
+        source = self._trend_source(region_id)
+        last_day = (source.last_day if source else None) or date.today()
+        return last_day - timedelta(days=days - 1), last_day
+
+    async def get_flights_by_type(self, entity_type: str, region_id: Union[int, str]):
+        titles = {
+            "all": '📈 Динамика полётов за месяц (все)',
+            "fiz": '👤 Полёты физических лиц за месяц',
+            "yur": '🏢 Полёты юридических лиц за месяц'
+        }
+        entity_type = entity_type if entity_type in titles else "all"
+        data = {'text': titles[entity_type]}
 
-            current_dir = os.path.dirname(__file__)
-            image_path = os.path.join(current_dir, "dinamic_all.png")
-            data['photo'] = FSInputFile(image_path)
-            data['text'] = '📈 Динамика полётов за месяц (все)'
+        date_from, date_to = self._trend_window(region_id)
+        source = self._trend_source(region_id)
+        if source is None:
+            counts = durations = np.zeros((len(KINDS), 0), dtype=np.int64)
+        else:
+            counts, durations = source.window(date_from, date_to)
+        kind = KINDS.index(entity_type)
+        series = counts[kind]
+        placeholder = FSInputFile(os.path.join(os.path.dirname(__file__), "dinamic_all.png"))
+        if entity_type != "all" and counts[0].any() and not counts[1:].any():
+            # полёты есть, но /flight не сообщает тип оператора — разбивки нет
+            data['photo'] = placeholder
+            data['text'] += '\nВ данных о полётах нет типа оператора, разбивка на физ./юр. лиц недоступна'
             return data
-
-        elif entity_type == "fiz": 
-            fl_trend = []
-            for day in base_trend:
-                total = day["flights"]
-                fl = int(total * 0.6 + np.random.randint(-2, 3))
-                fl = max(0, min(fl, total))
-                fl_trend.append({"date": day["date"], "flights": fl})
-
-            stats = {
-                "avg_time": "10",
-                "growth_ratio": "11,2%",
-                "total_flights": sum(d["flights"] for d in fl_trend)
-            }
-            # image_bytes = generate_flights_trend_chart(fl_trend, stats)
-            # photo = BufferedInputFile(image_bytes, filename="trend_fl.png")
-            current_dir = os.path.dirname(__file__)
-            image_path = os.path.join(current_dir, "dinamic_all.png")
-            data['photo'] = FSInputFile(image_path)
-            data['text'] = '👤 Полёты физических лиц за месяц'
+        if not series.any():
+            data['photo'] = placeholder
+            data['text'] += '\nДанные о полётах региона ещё загружаются'
             return data
 
-        else:
-            ul_trend = []
-            for day in base_trend:
-                total = day["flights"]
-                ul = int(total * 0.4 + np.random.randint(-2, 3))
-                ul = max(0, min(ul, total))
-                ul_trend.append({"date": day["date"], "flights": ul})
-
-            stats = {
-                "avg_time": "15",
-                "growth_ratio": "7,3%",
-                "total_flights": sum(d["flights"] for d in ul_trend)
-            }
-            # image_bytes = generate_flights_trend_chart(ul_trend, stats)
-            # photo = BufferedInputFile(image_bytes, filename="trend_ul.png")
-            current_dir = os.path.dirname(__file__)
-            image_path = os.path.join(current_dir, "dinamic_all.png")
-            data['photo'] = FSInputFile(image_path)
-            data['text'] = '🏢 Полёты юридических лиц за месяц'
+        total_flights, total_duration = int(series.sum()), int(durations[kind].sum())
+        changes = np.diff(series)
+        growth_days, decline_days = int((changes > 0).sum()), int((changes < 0).sum())
+        stats = {
+            "avg_time": round(total_duration / total_flights / 60),
+            "growth_ratio": f"{growth_days}:{decline_days}",
+            "total_flights": total_flights
+        }
+        trend = [
+            {"date": (date_from + timedelta(days=i)).isoformat(), "flights": int(flights)}
+            for i, flights in enumerate(series)
+        ]
+        try:
+            image_bytes = await render_service.render(generate_flights_trend_chart, trend, stats)
+        except RenderError as e:
+            print(f"[Render] Не удалось построить график {region_id}/{entity_type}: {e}")
+            data['photo'] = placeholder
+            data['text'] += '\nГрафик временно недоступен, попробуйте позже'
             return data
+        data['photo'] = BufferedInputFile(image_bytes, filename=f"trend_{entity_type}.png")
+        return data
 
     def format_top_regions_names_with_emojis(self, region_names: list) -> str:
         if not region_names:
@@ -304,180 +124,123 @@ class APIClient:
 
         return "\n".join(lines)
 
-    def generate_flight_report_json(region_id: int, region_name: str) -> bytes:
-        total_monthly = 231
-        days = 31
-        base_values = []
-        for i in range(1, days + 1):
-            val = (1.0 + 0.3 * np.sin(i / 4) + 0.1 * np.random.randn())
-            base_values.append(max(0.1, val))
-
-        scale = total_monthly / sum(base_values)
-        daily_all = [int(round(v * scale)) for v in base_values]
-
-        diff = total_monthly - sum(daily_all)
-        if daily_all:
-            daily_all[-1] = max(0, daily_all[-1] + diff)
-
-        daily_fl = []
-        daily_ul = []
-        for total in daily_all:
-            fl = int(total * 0.6 + np.random.randint(-2, 3))
-            fl = max(0, min(fl, total))
-            ul = total - fl
-            daily_fl.append(fl)
-            daily_ul.append(ul)
-
-        dates = [f"2025-07-{i:02d}" for i in range(1, 32)]
+    def generate_flight_report_json(self, region_id: int, region_name: str) -> bytes:
+        date_from, date_to = self._trend_window(region_id)
+        series = flight_store.daily_series(region_id, date_from, date_to)
         report = {
             "region": {
                 "id": region_id,
                 "name": region_name,
-                "period": "2025-07-01 — 2025-07-31"
+                "period": f"{date_from.isoformat()} — {date_to.isoformat()}"
             },
             "summary": {
-                "total_flights": sum(daily_all),
-                "fl_flights": sum(daily_fl),
-                "ul_flights": sum(daily_ul)
+                "total_flights": int(series["all"].sum()),
+                "fl_flights": int(series["fiz"].sum()),
+                "ul_flights": int(series["yur"].sum())
             },
             "daily": [
                 {
-                    "date": date,
-                    "all": all_f,
-                    "fl": fl_f,
-                    "ul": ul_f
+                    "date": (date_from + timedelta(days=i)).isoformat(),
+                    "all": int(all_f),
+                    "fl": int(fl_f),
+                    "ul": int(ul_f)
                 }
-                for date, all_f, fl_f, ul_f in zip(dates, daily_all, daily_fl, daily_ul)
+                for i, (all_f, fl_f, ul_f) in enumerate(zip(series["all"], series["fiz"], series["yur"]))
             ]
         }
 
         json_str = json.dumps(report, ensure_ascii=False, indent=2)
         return json_str.encode('utf-8')
 
-
-    def get_percent_up(self, region_id):
-        url_stat = f"{self.base_url}/statistics/region/{region_id}"
-
-        try:
-            response_stat = self.session.get(url_stat)
-            response_stat.raise_for_status()
-
-            statistic = response_stat.json().get('statistics')
-            all = statistic.get('by_year').get('all')
-
-            current_year = 0
-            last_year = 0
-            percent_year = 0
-            if len(all) > 0:
-                current_year = all[-1].get('flight_count')
-            
-            if len(all) > 1:
-                last_year = all[-2].get('flight_count')
-
-                percent_year = (current_year - last_year) * 100 / last_year
-
-            if percent_year >= 0:
-                percent_year =  f"🔺+{round(percent_year, 2)}%"
-            else:
-                percent_year =  f"🔻{round(percent_year, 2)}%"
-
-            by_year_and_month = statistic.get('by_year_and_month').get('all')
-            percent_months = 0
-            list_counts_by_months = []
-            if len(by_year_and_month) > 0:
-                year = by_year_and_month[-1].get('months')
-                list_counts_by_months = self._parse_months(year)
-                current_months = year[-1].get('flight_count')
-                last_months = year[-2].get('flight_count')
-                percent_months = (current_months - last_months) * 100 / last_months
-            
-            if percent_months >= 0:
-                percent_months =  f"🔺+{round(percent_months, 2)}%"
-            else:
-                percent_months =  f"🔻{round(percent_months, 2)}%"
-            
-
-
-
-                
-
-        except requests.RequestException as e:
-            print(f"[API Error] Не удалось получить города: {e}")
-            return None
-        
-
     def _parse_months(self, months: list):
         counts = []
         for m in months:
             flight_count = m.get('flight_count')
             counts.append(flight_count)
         return counts
-    
-    
-    def _parse_years(self, years: list) -> List[YearStatistic]:
-        all_flights = []
-        for year in years:
-            year_stat = YearStatistic(
-                year=year.get('year'),
-                flight_count=year.get('flight_count'),
-                avg_time=year.get('avg_flight_time	'),
-                total_time=year.get('total_time	')
-            )
-            all_flights.append(year_stat)
-        return all_flights
-    
-
-    def find_region_by_name(self, name: str) -> Optional[Dict]:
-        name_lower = name.strip().lower()
-        for region in self.get_all_regions():
-            if region["name"].lower() == name_lower:
-                return region
-        return None
-
-    def find_region_by_code(self, code: str) -> Optional[Dict]:
-        for region in self.get_all_regions():
-            if region["code"] == code:
-                return region
-        return None
-
-    def get_flights(
-        self,
-        date_from: Optional[str] = None,
-        date_to: Optional[str] = None,
-        region_ids: Optional[List[int]] = None,
-        page: int = 1,
-        per_page: int = 100
-    ) -> Optional[Dict]:
-  
-        url = f"{self.base_url}/flight"
-        params = {"page": page, "per_page": per_page}
-        if date_from:
-            params["datefrom"] = date_from
-        if date_to:
-            params["dateto"] = date_to
-        if region_ids:
-            params["regions[]"] = region_ids  
 
+    @staticmethod
+    def _to_int(value) -> Optional[int]:
+        # API отдаёт год и месяц то числом, то строкой: "year": "2024", "month": "1"
         try:
-            response = self.session.get(url, params=params)
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            print(f"[API Error] Не удалось получить полёты: {e}")
+            return int(value)
+        except (TypeError, ValueError):
             return None
 
-    def get_all_flights(
-        self,
-        date_from: Optional[str] = None,
-        date_to: Optional[str] = None,
-        region_ids: Optional[List[int]] = None
-    ) -> List[Dict]:
-        params = {}
-        if date_from:
-            params["datefrom"] = date_from
-        if date_to:
-            params["dateto"] = date_to
-        if region_ids:
-            params["regions[]"] = region_ids
+    @staticmethod
+    def _by_kind(value) -> Dict:
+        # {"all": [...], "fiz": [...], "yur": [...]} либо просто список/число без разбивки — тогда это "all"
+        return value if isinstance(value, dict) else {'all': value}
+
+    @staticmethod
+    def _total_time(entry: Dict) -> int:
+        # total_time есть не во всех ответах: тогда восстанавливаем по среднему и числу полётов
+        if entry.get('total_time'):
+            return duration_to_seconds(entry.get('total_time'))
+        return duration_to_seconds(entry.get('avg_flight_time')) * (entry.get('flight_count') or 0)
+
+    def _parse_years(self, years: Optional[list]) -> List[YearStatistic]:
+        return [
+            YearStatistic(
+                year=self._to_int(year.get('year')),
+                flight_count=year.get('flight_count') or 0,
+                avg_time=duration_to_seconds(year.get('avg_flight_time')),
+                total_time=self._total_time(year)
+            )
+            for year in years or []
+            if self._to_int(year.get('year')) is not None
+        ]
+
+    def _parse_year_months(self, years: Optional[list]) -> List[MonthStatistic]:
+        return [
+            MonthStatistic(
+                year=self._to_int(year.get('year')),
+                month=self._to_int(month.get('month')),
+                flight_count=month.get('flight_count') or 0,
+                avg_time=duration_to_seconds(month.get('avg_flight_time')),
+                total_time=self._total_time(month)
+            )
+            for year in years or []
+            for month in year.get('months') or []
+            if self._to_int(year.get('year')) is not None and self._to_int(month.get('month')) is not None
+        ]
+
+    def _build_statistic(self, region_id: int, name: Optional[str], report: Dict) -> Statistic:
+        # весь разбор идёт по одному уже декодированному ответу /statistics/region/{id}
+        statistics = report.get('statistics') or {}
+        by_year = self._by_kind(statistics.get('by_year') or {})
+        by_year_and_month = self._by_kind(statistics.get('by_year_and_month') or {})
+        total_flights = self._by_kind((report.get('summary') or {}).get('total_flights') or {})
+        return Statistic(
+            id=region_id,
+            name=name,
+            total_flights_all=total_flights.get('all') or 0,
+            total_flights_yur=total_flights.get('yur') or 0,
+            total_flights_fiz=total_flights.get('fiz') or 0,
+            all_flights_years=self._parse_years(by_year.get('all')),
+            fiz_flights_years=self._parse_years(by_year.get('fiz')),
+            yur_flights_years=self._parse_years(by_year.get('yur')),
+            all_flights_months=self._parse_year_months(by_year_and_month.get('all')),
+            fiz_flights_months=self._parse_year_months(by_year_and_month.get('fiz')),
+            yur_flights_months=self._parse_year_months(by_year_and_month.get('yur'))
+        )
+
+    def _percent_up(self, statistic: Statistic) -> Dict:
+        years = statistic.all_flights_years
+        percent_year = 0
+        if len(years) > 1 and years[-2].flight_count:
+            percent_year = (years[-1].flight_count - years[-2].flight_count) * 100 / years[-2].flight_count
+
+        months = statistic.all_flights_months
+        if months:
+            months = [month for month in months if month.year == months[-1].year]
+        percent_months = 0
+        if len(months) > 1 and months[-2].flight_count:
+            percent_months = (months[-1].flight_count - months[-2].flight_count) * 100 / months[-2].flight_count
+
+        return {
+            'year': f"🔺+{round(percent_year, 2)}%" if percent_year >= 0 else f"🔻{round(percent_year, 2)}%",
+            'month': f"🔺+{round(percent_months, 2)}%" if percent_months >= 0 else f"🔻{round(percent_months, 2)}%",
+            'months': [month.flight_count for month in months]
+        }
 
-        return self._get_paginated_data(f"{self.base_url}/flight", params)
\ No newline at end of file
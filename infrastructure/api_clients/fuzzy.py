@@ -0,0 +1,131 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+_TRANSLIT = str.maketrans({
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ж": "zh", "з": "z", "и": "i",
+    "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r", "с": "s",
+    "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "shch",
+    "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+})
+# латинские варианты, которые люди пишут по-разному, сводим к одному
+_LATIN_FOLDS = (("iy", "y"), ("yy", "y"), ("ij", "y"), ("j", "y"), ("x", "ks"), ("h", ""), ("w", "v"))
+_NOISE = re.compile(r"[^a-z0-9 ]+")
+_SPACES = re.compile(r"\s+")
+
+# слова, без которых регион всё равно узнаваем: «Красноярский» == «Красноярский край»
+_STOP_WORDS = (
+    "область", "обл", "край", "республика", "респ", "автономный", "автономная", "округ", "ао", "город", "г",
+    "федерального", "значения",
+    "oblast", "krai", "kray", "republic", "of", "the", "region", "autonomous", "okrug", "city",
+)
+
+ABBREVIATIONS = {
+    "мск": "Москва", "москва": "Москва", "спб": "Санкт-Петербург", "питер": "Санкт-Петербург",
+    "лен обл": "Ленинградская область", "ленобласть": "Ленинградская область",
+    "мо": "Московская область", "подмосковье": "Московская область",
+    "хмао": "Ханты-Мансийский", "югра": "Ханты-Мансийский", "янао": "Ямало-Ненецкий", "нао": "Ненецкий",
+    "чао": "Чукотский", "еао": "Еврейская", "кбр": "Кабардино-Балкарская", "кчр": "Карачаево-Черкесская",
+    "рт": "Татарстан", "рб": "Башкортостан", "башкирия": "Башкортостан", "якутия": "Саха", "рсо": "Северная Осетия", "кузбасс": "Кемеровская",
+}
+
+
+def fuzzy_key(value) -> str:
+    text = str(value).lower().replace("ё", "е").translate(_TRANSLIT)
+    text = _NOISE.sub(" ", text.replace("-", " ").replace("_", " "))
+    for old, new in _LATIN_FOLDS:
+        text = text.replace(old, new)
+    return _SPACES.sub(" ", text).strip()
+
+
+STOP_WORDS = {fuzzy_key(word) for word in _STOP_WORDS}
+
+
+def strip_stop_words(key: str) -> str:
+    return " ".join(word for word in key.split(" ") if word not in STOP_WORDS)
+
+
+def _trigrams(key: str) -> List[str]:
+    padded = f"  {key} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def bounded_distance(query: str, key: str, bound: int) -> int:
+    # Левенштейн с отсечением по bound; заодно меряем расстояние до лучшего префикса ключа
+    # (со штрафом 1), чтобы «красноярск» находил «красноярский край»
+    truncated = key[:len(query) + bound]
+    previous = list(range(len(truncated) + 1))
+    for i, char_q in enumerate(query, 1):
+        current = [i]
+        for j, char_k in enumerate(truncated, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_q != char_k)))
+        if min(current) > bound:
+            return bound + 1
+        previous = current
+    full = previous[-1] if len(truncated) == len(key) else bound + 1
+    return min(full, min(previous) + 1)
+
+
+@dataclass(slots=True, frozen=True)
+class FuzzyMatch:
+    item: Dict
+    key: str
+    distance: int
+
+
+class FuzzyIndex:
+    def __init__(self, entries: Iterable[Tuple[Dict, Iterable[str]]], aliases: Optional[Dict[str, str]] = None):
+        self._items: List[Dict] = []
+        self._keys: List[Tuple[int, str]] = []
+        self._trigrams: Dict[str, List[int]] = {}
+        self._exact: Dict[str, int] = {}
+        for item, values in entries:
+            item_id = len(self._items)
+            self._items.append(item)
+            keys = {fuzzy_key(value) for value in values if value}
+            keys |= {strip_stop_words(key) for key in keys}
+            # отдельные слова составных названий: «петербург», «балкария»
+            keys |= {word for key in keys for word in key.split(" ") if len(word) >= 4}
+            for key in filter(None, keys):
+                key_id = len(self._keys)
+                self._keys.append((item_id, key))
+                self._exact.setdefault(key, key_id)
+                for trigram in set(_trigrams(key)):
+                    self._trigrams.setdefault(trigram, []).append(key_id)
+        self._aliases = {fuzzy_key(alias): fuzzy_key(target) for alias, target in (aliases or {}).items()}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _candidates(self, query: str, bound: int, limit: int) -> List[int]:
+        trigrams = set(_trigrams(query))
+        shared: Dict[int, int] = {}
+        for trigram in trigrams:
+            for key_id in self._trigrams.get(trigram, ()):
+                shared[key_id] = shared.get(key_id, 0) + 1
+        # каждая правка портит не больше трёх триграмм — остальные ключи заведомо дальше bound
+        threshold = max(1, len(trigrams) - 3 * bound - 1)
+        return sorted((key_id for key_id, count in shared.items() if count >= threshold), key=shared.get, reverse=True)[:limit]
+
+    def match(self, query: str, limit: int = 5, max_distance: Optional[int] = None) -> List[FuzzyMatch]:
+        query = fuzzy_key(query)
+        query = self._aliases.get(query, query)
+        short = strip_stop_words(query) or query
+        if not short:
+            return []
+        bound = max_distance if max_distance is not None else max(1, len(short) // 3)
+
+        best: Dict[int, Tuple[int, str]] = {}
+        exact = self._exact.get(short, self._exact.get(query))
+        if exact is not None:
+            best[self._keys[exact][0]] = (0, self._keys[exact][1])
+
+        for key_id in self._candidates(short, bound, limit * 4):
+            item_id, key = self._keys[key_id]
+            distance = bounded_distance(short, key, bound)
+            if distance <= bound and distance < best.get(item_id, (bound + 1,))[0]:
+                best[item_id] = (distance, key)
+
+        ranked = sorted(best.items(), key=lambda entry: (entry[1][0], len(entry[1][1])))
+        return [FuzzyMatch(self._items[item_id], key, distance) for item_id, (distance, key) in ranked[:limit]]
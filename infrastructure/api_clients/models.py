@@ -1,16 +1,25 @@
-from dataclasses import dataclass
-from typing import List
+from dataclasses import dataclass, field
+from typing import List, Optional
 
 
-@dataclass
+@dataclass(slots=True)
+class MonthStatistic:
+    year: int
+    month: int
+    flight_count: int
+    avg_time: int     # секунды
+    total_time: int   # секунды
+
+
+@dataclass(slots=True)
 class YearStatistic:
     year: int
     flight_count: int
-    avg_time: str
-    total_time: str
+    avg_time: int     # секунды
+    total_time: int   # секунды
 
 
-@dataclass
+@dataclass(slots=True)
 class Statistic:
     id: int
     name: str
@@ -20,4 +29,19 @@ class Statistic:
     all_flights_years: List[YearStatistic]
     fiz_flights_years: List[YearStatistic]
     yur_flights_years: List[YearStatistic]
+    all_flights_months: List[MonthStatistic] = field(default_factory=list)
+    fiz_flights_months: List[MonthStatistic] = field(default_factory=list)
+    yur_flights_months: List[MonthStatistic] = field(default_factory=list)
+
 
+def duration_to_seconds(value: Optional[str]) -> int:
+    # '1:57:12', '831:10:00' (часы не ограничены сутками) или '57:12'
+    if not value:
+        return 0
+    try:
+        seconds = 0
+        for part in str(value).strip().split(':'):
+            seconds = seconds * 60 + int(float(part))
+        return seconds
+    except ValueError:
+        return 0
@@ -0,0 +1,114 @@
+import heapq
+import re
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+
+REGION_SEARCH_KEYS = ("name", "fullname")
+CITY_SEARCH_KEYS = ("name", "name_alt")
+_SEPARATORS = re.compile(r"[\s\-_]+")
+
+# порядок выдачи: точное совпадение, начало строки, начало слова, вхождение
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING = range(4)
+
+
+def fold(value) -> str:
+    return _SEPARATORS.sub(" ", str(value).lower().replace("ё", "е")).strip()
+
+
+def _trigrams(value: str) -> Set[str]:
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def _population(item: Dict) -> int:
+    value = str(item.get("population") or "")
+    return int(value) if value.isdigit() else 0
+
+
+@dataclass(slots=True, frozen=True)
+class SearchHit:
+    kind: str   # "region" или "city"
+    item: Dict
+
+
+class SearchIndex:
+    def __init__(self, regions: List[Dict], cities: List[Dict]):
+        self._entries: List[SearchHit] = []
+        self._keys: List[Tuple[str, ...]] = []
+        self._order: List[Tuple[int, int]] = []
+        self._trigrams: Dict[str, List[int]] = {}
+        words = []
+
+        for kind, items, key_names in (("region", regions, REGION_SEARCH_KEYS), ("city", cities, CITY_SEARCH_KEYS)):
+            for item in items:
+                keys = tuple(dict.fromkeys(fold(item[name]) for name in key_names if item.get(name)))
+                if not keys:
+                    continue
+                entry = len(self._entries)
+                self._entries.append(SearchHit(kind, item))
+                self._keys.append(keys)
+                # при равном качестве совпадения регионы идут раньше городов, крупные — раньше мелких
+                self._order.append((0 if kind == "region" else 1, -_population(item)))
+                for key in keys:
+                    for trigram in _trigrams(key):
+                        self._trigrams.setdefault(trigram, []).append(entry)
+                    position = 0
+                    for word in key.split(" "):
+                        words.append((key[position:], entry))
+                        position += len(word) + 1
+
+        for postings in self._trigrams.values():
+            postings[:] = sorted(set(postings))
+        # хвосты ключей, начинающиеся с границы слова, — для коротких запросов (меньше трёх букв)
+        words.sort()
+        self._suffixes = [suffix for suffix, _ in words]
+        self._suffix_entries = [entry for _, entry in words]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _candidates(self, query: str) -> Set[int]:
+        if len(query) < 3:
+            start = bisect_left(self._suffixes, query)
+            end = bisect_left(self._suffixes, query + "\uffff")
+            return set(self._suffix_entries[start:end])
+
+        postings = sorted((self._trigrams.get(trigram, []) for trigram in _trigrams(query)), key=len)
+        if not postings or not postings[0]:
+            return set()
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                break
+        return candidates
+
+    def _grade(self, entry: int, query: str) -> Optional[int]:
+        grade = None
+        for key in self._keys[entry]:
+            if key == query:
+                return EXACT
+            if key.startswith(query):
+                current = PREFIX
+            elif f" {query}" in f" {key}":
+                current = WORD_PREFIX
+            elif query in key:
+                current = SUBSTRING
+            else:
+                continue
+            grade = current if grade is None else min(grade, current)
+        return grade
+
+    def search(self, query: str, limit: Optional[int] = 50) -> List[SearchHit]:
+        query = fold(query)
+        if not query:
+            return [entry for entry in self._entries if entry.kind == "region"][:limit]
+
+        graded = []
+        for entry in self._candidates(query):
+            grade = self._grade(entry, query)
+            if grade is not None:
+                graded.append((grade, self._order[entry], self._keys[entry][0], entry))
+        graded = sorted(graded) if limit is None else heapq.nsmallest(limit, graded)
+        return [self._entries[entry] for *_, entry in graded]
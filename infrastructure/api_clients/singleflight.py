@@ -0,0 +1,42 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.started = 0
+        self.shared = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            self.started += 1
+            call = asyncio.ensure_future(fn())
+            self._calls[key] = call
+            call.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.shared += 1
+        # shield: отмена одного ожидающего не должна отменять общий запрос для остальных
+        return await asyncio.shield(call)
+
+    def _finish(self, key: Hashable, call: asyncio.Future):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # если все ожидающие отменены, исключение общего запроса никто не прочтёт —
+        # забираем его здесь, иначе asyncio пишет «Future exception was never retrieved»
+        if not call.cancelled():
+            call.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._calls),
+            "started": self.started,
+            "shared": self.shared
+        }
+
+
+upstream_calls = SingleFlight()
@@ -0,0 +1,193 @@
+import asyncio
+import hashlib
+import json
+import os
+import sys
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional
+from configuration.config import CHART_CACHE_DIR, CHART_CACHE_DISK_BYTES, CHART_CACHE_MEMORY_BYTES
+
+
+_SOURCE_HASHES: Dict[str, str] = {}
+
+
+def _source_hash(func: Callable) -> str:
+    # версия кода отрисовки: после правки модуля с графиками старые картинки не используются
+    module = sys.modules.get(func.__module__)
+    path = getattr(module, "__file__", None) or func.__module__
+    if path not in _SOURCE_HASHES:
+        try:
+            with open(path, "rb") as f:
+                _SOURCE_HASHES[path] = hashlib.sha256(f.read()).hexdigest()[:16]
+        except OSError:
+            _SOURCE_HASHES[path] = ""
+    return _SOURCE_HASHES[path]
+
+
+def chart_key(func: Callable, args: tuple, kwargs: Dict) -> str:
+    # ключ — хэш функции и её входных данных: одинаковые данные дают одну и ту же картинку
+    payload = json.dumps(
+        [f"{func.__module__}.{func.__qualname__}", _source_hash(func), args, kwargs],
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=repr
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ChartCache:
+    # Два уровня: LRU в памяти, ограниченный по байтам, и каталог на диске с вытеснением
+    # давно не использованных файлов по суммарному размеру. Диск переживает перезапуск бота.
+    def __init__(self, directory: str = CHART_CACHE_DIR, memory_bytes: int = CHART_CACHE_MEMORY_BYTES, disk_bytes: int = CHART_CACHE_DISK_BYTES):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_size = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()   # ключ -> размер файла, от давних к свежим
+        self._disk_size = 0
+        self._loaded = False
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.png")
+
+    def load(self):
+        # индекс диска по mtime: при чтении файл «трогается», так что mtime — время последнего использования
+        self._disk.clear()
+        self._disk_size = 0
+        self._loaded = True
+        if not os.path.isdir(self.directory):
+            return
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                if not name.endswith(".png"):
+                    # недописанные .tmp после падения
+                    os.remove(path)
+                    continue
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(files):
+            self._disk[key] = size
+            self._disk_size += size
+        print(f"[ChartCache] На диске {len(self._disk)} графиков, {self._disk_size // 1024} КБ")
+
+    def _remember(self, key: str, data: bytes):
+        if len(data) > self.memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_size -= len(self._memory[key])
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _read(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def _write(self, key: str, data: bytes, evicted: List[str]):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(data)
+        os.replace(f"{path}.tmp", path)
+        for old in evicted:
+            try:
+                os.remove(self._path(old))
+            except FileNotFoundError:
+                pass
+
+    async def get(self, key: str) -> Optional[bytes]:
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return data
+        if not self._loaded:
+            self.load()
+        if key not in self._disk:
+            self.misses += 1
+            return None
+
+        data = await asyncio.to_thread(self._read, key)
+        if data is None:
+            # файл удалили снаружи
+            self._disk_size -= self._disk.pop(key, 0)
+            self.misses += 1
+            return None
+        if key in self._disk:
+            self._disk.move_to_end(key)
+        self._remember(key, data)
+        self.disk_hits += 1
+        return data
+
+    async def set(self, key: str, data: bytes):
+        self._remember(key, data)
+        if not self._loaded:
+            self.load()
+        self._disk_size += len(data) - self._disk.get(key, 0)
+        self._disk[key] = len(data)
+        self._disk.move_to_end(key)
+        evicted = []
+        while self._disk_size > self.disk_bytes and len(self._disk) > 1:
+            old, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            evicted.append(old)
+        try:
+            await asyncio.to_thread(self._write, key, data, evicted)
+        except OSError as e:
+            self._disk_size -= self._disk.pop(key, 0)
+            print(f"[ChartCache] Не удалось сохранить график {key}: {e}")
+
+    async def get_or_render(self, key: str, render: Callable[[], Awaitable[bytes]]) -> bytes:
+        data = await self.get(key)
+        if data is not None:
+            return data
+        # одинаковые запросы, пришедшие одновременно, ждут одну отрисовку
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        pending = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            data = await render()
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except Exception as e:
+            pending.set_exception(e)
+            # исключение получат ожидающие; если их нет, не ругаемся на «never retrieved»
+            pending.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        pending.set_result(data)
+        await self.set(key, data)
+        return data
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_size,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_size,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "inflight": len(self._inflight)
+        }
+
+
+chart_cache = ChartCache()
@@ -0,0 +1,30 @@
+import time
+from typing import Dict, Optional
+from infrastructure.api_clients.catalog import catalog
+from infrastructure.api_clients.models import Statistic
+from infrastructure.stat_matrix import StatisticsMatrix
+
+
+class RegionDataset:
+    def __init__(self):
+        self.statistics: Dict[int, Statistic] = {}
+        self.matrix: Optional[StatisticsMatrix] = None
+        self.updated_at: Optional[float] = None
+
+    async def refresh(self, client):
+        region_ids = [region["id"] for region in catalog.regions]
+        statistics = await client.get_statistics_many(region_ids, fresh=True)
+        fresh = {statistic.id: statistic for statistic in statistics if statistic is not None}
+        if not fresh:
+            raise RuntimeError("не удалось получить статистику ни по одному региону")
+        # регионы, которые не ответили, остаются со старыми данными
+        self.statistics = {**self.statistics, **fresh}
+        self.updated_at = time.time()
+        # помесячная матрица — дополнение к карточкам; её сбой не должен останавливать рейтинг и свёртку
+        try:
+            self.matrix = StatisticsMatrix.build(self.statistics.values())
+        except Exception as e:
+            print(f"[Dataset] Не удалось построить помесячную матрицу, остаётся прежняя: {e!r}")
+
+
+dataset = RegionDataset()
@@ -0,0 +1,127 @@
+import asyncio
+import math
+import numpy as np
+from typing import Dict, Iterable, Optional
+from infrastructure.flight_store import FlightStore, flight_store
+
+
+# Логарифмические корзины (как в DDSketch): относительная погрешность квантилей не больше ACCURACY,
+# набор корзин фиксирован, поэтому слияние скетчей — просто сложение массивов.
+ACCURACY = 0.01
+GAMMA = (1 + ACCURACY) / (1 - ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+MAX_SECONDS = 7 * 24 * 3600
+BUCKETS = math.ceil(math.log(MAX_SECONDS) / LOG_GAMMA) + 1
+
+
+class DurationSketch:
+    __slots__ = ("counts", "zeros", "total", "max")
+
+    def __init__(self):
+        self.counts = np.zeros(BUCKETS, dtype=np.int32)
+        self.zeros = 0
+        self.total = 0
+        self.max = 0
+
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum()) + self.zeros
+
+    def add(self, seconds: Iterable[int]) -> "DurationSketch":
+        seconds = np.asarray(seconds, dtype=np.int64)
+        seconds = seconds[seconds >= 0]
+        if not seconds.size:
+            return self
+        positive = seconds[seconds > 0]
+        self.zeros += int(seconds.size - positive.size)
+        buckets = np.minimum(np.ceil(np.log(positive) / LOG_GAMMA).astype(np.int64), BUCKETS - 1)
+        self.counts += np.bincount(buckets, minlength=BUCKETS).astype(np.int32)
+        self.total += int(seconds.sum())
+        self.max = max(self.max, int(seconds.max()))
+        return self
+
+    def merge(self, other: "DurationSketch") -> "DurationSketch":
+        self.counts += other.counts
+        self.zeros += other.zeros
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        return self
+
+    def subtract(self, other: "DurationSketch") -> "DurationSketch":
+        # максимум вычесть нельзя — его пересчитывает тот, кто знает остальные слагаемые
+        self.counts -= other.counts
+        self.zeros -= other.zeros
+        self.total -= other.total
+        return self
+
+    @classmethod
+    def merged(cls, sketches: Iterable["DurationSketch"]) -> "DurationSketch":
+        result = cls()
+        for sketch in sketches:
+            result.merge(sketch)
+        return result
+
+    def quantile(self, q: float) -> Optional[int]:
+        count = self.count
+        if not count:
+            return None
+        rank = q * (count - 1)
+        if rank < self.zeros:
+            return 0
+        bucket = int(np.searchsorted(np.cumsum(self.counts), rank - self.zeros, side="right"))
+        # середина корзины (gamma^(i-1), gamma^i] в смысле относительной ошибки
+        return min(round(2 * GAMMA ** bucket / (GAMMA + 1)), self.max)
+
+    def summary(self) -> Dict[str, Optional[int]]:
+        count = self.count
+        return {
+            "count": count,
+            "total": self.total,
+            "mean": round(self.total / count) if count else None,
+            "median": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "max": self.max if count else None
+        }
+
+
+class DurationIndex:
+    # скетч длительностей на каждый месяц региона; год, регион целиком и сводки по группам регионов — слияние
+    def __init__(self, store: FlightStore = flight_store):
+        self.store = store
+        self._regions: Dict[int, Dict[str, DurationSketch]] = {}
+
+    def _build(self, region_ids: Iterable[int]) -> Dict[int, Dict[str, DurationSketch]]:
+        return {
+            int(region_id): {
+                month: DurationSketch().add(self.store.read_partition(int(region_id), month)["duration"])
+                for month in self.store.months(int(region_id))
+            }
+            for region_id in region_ids
+        }
+
+    def rebuild(self, region_ids: Iterable[int]):
+        self._regions.update(self._build(region_ids))
+
+    async def update(self, region_ids: Iterable[int]):
+        self._regions.update(await asyncio.to_thread(self._build, list(region_ids)))
+
+    def _months(self, region_id: int) -> Dict[str, DurationSketch]:
+        return self._regions.get(int(region_id), {})
+
+    def last_period(self, region_id: int) -> Optional[str]:
+        months = self._months(region_id)
+        return max(months) if months else None
+
+    def sketch(self, region_id: int, period: Optional[str] = None) -> DurationSketch:
+        # period: None — всё время, "2025" — год, "2025-06" — месяц
+        return DurationSketch.merged(
+            sketch for month, sketch in self._months(region_id).items()
+            if period is None or month.startswith(period)
+        )
+
+    def rollup(self, region_ids: Iterable[int], period: Optional[str] = None) -> DurationSketch:
+        return DurationSketch.merged(self.sketch(region_id, period) for region_id in region_ids)
+
+
+duration_index = DurationIndex()
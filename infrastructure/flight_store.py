@@ -0,0 +1,295 @@
+import asyncio
+import json
+import os
+import re
+import threading
+import numpy as np
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from configuration.config import (
+    FLIGHT_STORE_DIR,
+    FLIGHT_STORE_FLUSH_ROWS,
+    FLIGHT_SYNC_OVERLAP_DAYS,
+    FLIGHT_SYNC_CONCURRENCY
+)
+from infrastructure.api_clients.models import duration_to_seconds
+
+
+EPOCH = date(1970, 1, 1)
+KIND_CODES = {"fiz": 0, "fl": 0, "yur": 1, "ul": 1}
+KIND_NAMES = ("fiz", "yur")
+
+FLIGHT_DTYPE = np.dtype([
+    ("id", np.int64),
+    ("region", np.int32),
+    ("day", np.int32),       # дни от 1970-01-01
+    ("kind", np.int8),       # 0 — физ. лицо, 1 — юр. лицо, -1 — неизвестно
+    ("duration", np.int32),  # секунды, -1 — неизвестно
+    ("lat", np.float32),
+    ("lon", np.float32),
+])
+
+# Поля /flight (см. «полеты и еще статистика.docx»): dof — дата, dep_time/arr_time — время вылета
+# и посадки, dep — точка вылета в формате 5601N03543E. Тип оператора (физ./юр. лицо) в записи нет,
+# поле typ — тип воздушного судна (BLA/AER), поэтому kind остаётся -1.
+FLIGHT_FIELDS = {
+    "region": ("region_id",),
+    "date": ("dof",),
+    "dep_time": ("dep_time",),
+    "arr_time": ("arr_time",),
+    "dep": ("dep",),
+    "kind": (),
+}
+DAY_SECONDS = 24 * 3600
+_COORDINATE = re.compile(r"^(\d{2})(\d{2})(\d{2})?([NS])(\d{3})(\d{2})(\d{2})?([EW])$")
+
+
+def day_number(value: date) -> int:
+    return (value - EPOCH).days
+
+
+def day_to_date(day: int) -> date:
+    return EPOCH + timedelta(days=int(day))
+
+
+def _field(flight: Dict, name: str):
+    for key in FLIGHT_FIELDS[name]:
+        value = flight.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _parse_day(value) -> Optional[int]:
+    text = str(value).strip()
+    for parse in (lambda: date.fromisoformat(text[:10]), lambda: datetime.strptime(text[:10], "%d.%m.%Y").date()):
+        try:
+            return day_number(parse())
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_coordinates(value) -> Tuple[float, float]:
+    # DDMM[SS]N/S DDDMM[SS]E/W -> градусы; нераспознанная точка — (nan, nan)
+    match = _COORDINATE.match(str(value or "").strip().upper())
+    if match is None:
+        return np.nan, np.nan
+    lat_d, lat_m, lat_s, lat_h, lon_d, lon_m, lon_s, lon_h = match.groups()
+    lat = int(lat_d) + int(lat_m) / 60 + int(lat_s or 0) / 3600
+    lon = int(lon_d) + int(lon_m) / 60 + int(lon_s or 0) / 3600
+    return (-lat if lat_h == "S" else lat), (-lon if lon_h == "W" else lon)
+
+
+def _flight_duration(dep_time, arr_time) -> int:
+    # секунды от вылета до посадки; "24:00:00" — конец суток, посадка раньше вылета — уже на следующий день.
+    # -1 — длительность неизвестна (такие записи не попадают в суммы и скетчи)
+    if not dep_time or not arr_time:
+        return -1
+    departure, arrival = duration_to_seconds(dep_time), duration_to_seconds(arr_time)
+    if arrival < departure:
+        arrival += DAY_SECONDS
+    return arrival - departure
+
+
+def flight_to_row(flight: Dict) -> Optional[Tuple]:
+    region = _field(flight, "region")
+    if isinstance(region, dict):
+        region = region.get("id")
+    date_value = _field(flight, "date")
+    day = _parse_day(date_value) if date_value is not None else None
+    if flight.get("id") is None or region is None or day is None:
+        return None
+
+    lat, lon = _parse_coordinates(_field(flight, "dep"))
+    return (
+        int(flight["id"]),
+        int(region),
+        day,
+        KIND_CODES.get(str(_field(flight, "kind")).lower(), -1),
+        _flight_duration(_field(flight, "dep_time"), _field(flight, "arr_time")),
+        lat,
+        lon,
+    )
+
+
+def month_keys(days: np.ndarray) -> np.ndarray:
+    # дни от эпохи -> "YYYY-MM" без цикла по строкам
+    return np.datetime_as_string(np.asarray(days).astype("datetime64[D]").astype("datetime64[M]"), unit="M")
+
+
+def merge_records(existing: np.ndarray, new: np.ndarray) -> np.ndarray:
+    # при повторе id остаётся более свежая запись из new
+    combined = np.concatenate([existing, new])[::-1]
+    _, first = np.unique(combined["id"], return_index=True)
+    merged = combined[first]
+    return merged[np.lexsort((merged["id"], merged["day"]))]
+
+
+class FlightStore:
+    # Колоночное хранилище: data/flights/region_<id>/<YYYY-MM>.npy со структурированными массивами FLIGHT_DTYPE
+    def __init__(self, root: str = FLIGHT_STORE_DIR):
+        self.root = root
+        # append читает и переписывает партиции: параллельные записи из разных потоков сериализуем
+        self._write_lock = threading.Lock()
+
+    def _region_dir(self, region_id: int) -> str:
+        return os.path.join(self.root, f"region_{int(region_id)}")
+
+    def region_ids(self) -> List[int]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(int(name.split("_", 1)[1]) for name in os.listdir(self.root) if name.startswith("region_"))
+
+    def months(self, region_id: int) -> List[str]:
+        directory = self._region_dir(region_id)
+        if not os.path.isdir(directory):
+            return []
+        # *.npy.tmp.npy — недописанный после падения файл, а не партиция
+        return sorted(
+            name[:-4] for name in os.listdir(directory) if name.endswith(".npy") and not name.endswith(".tmp.npy")
+        )
+
+    def read_partition(self, region_id: int, month: str) -> np.ndarray:
+        path = os.path.join(self._region_dir(region_id), f"{month}.npy")
+        if not os.path.exists(path):
+            return np.empty(0, dtype=FLIGHT_DTYPE)
+        return np.load(path, mmap_mode="r")
+
+    def read(self, region_id: int, date_from: Optional[date] = None, date_to: Optional[date] = None) -> np.ndarray:
+        first = date_from.strftime("%Y-%m") if date_from else ""
+        last = date_to.strftime("%Y-%m") if date_to else "9999-99"
+        parts = [self.read_partition(region_id, month) for month in self.months(region_id) if first <= month <= last]
+        if not parts:
+            return np.empty(0, dtype=FLIGHT_DTYPE)
+        records = np.concatenate(parts)
+        mask = np.ones(len(records), dtype=bool)
+        if date_from:
+            mask &= records["day"] >= day_number(date_from)
+        if date_to:
+            mask &= records["day"] <= day_number(date_to)
+        return records[mask]
+
+    def write_partition(self, region_id: int, month: str, records: np.ndarray):
+        directory = self._region_dir(region_id)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{month}.npy")
+        tmp_path = f"{path}.tmp.npy"
+        np.save(tmp_path, np.ascontiguousarray(records, dtype=FLIGHT_DTYPE))
+        os.replace(tmp_path, path)
+
+    def append(self, records: np.ndarray) -> int:
+        written = 0
+        order = np.lexsort((records["day"], records["region"]))
+        records = records[order]
+        months = month_keys(records["day"])
+        with self._write_lock:
+            for region_id in np.unique(records["region"]):
+                in_region = records["region"] == region_id
+                for month in np.unique(months[in_region]):
+                    batch = records[in_region & (months == month)]
+                    existing = np.array(self.read_partition(int(region_id), str(month)))
+                    self.write_partition(int(region_id), str(month), merge_records(existing, batch))
+                    written += len(batch)
+        return written
+
+    def _flush(self, rows: List[Tuple]) -> int:
+        return self.append(np.array(rows, dtype=FLIGHT_DTYPE))
+
+    async def ingest(
+        self,
+        client,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        region_ids: Optional[List[int]] = None
+    ) -> int:
+        # поток страниц /flight пишется пачками по FLIGHT_STORE_FLUSH_ROWS, память не растёт с периодом
+        rows, written, skipped = [], 0, 0
+        async for flight in client.iter_flights(date_from, date_to, region_ids):
+            row = flight_to_row(flight)
+            if row is None:
+                skipped += 1
+                continue
+            rows.append(row)
+            if len(rows) >= FLIGHT_STORE_FLUSH_ROWS:
+                # чтение, слияние и запись партиций — в потоке, чтобы не останавливать цикл событий бота
+                written += await asyncio.to_thread(self._flush, rows)
+                rows = []
+        if rows:
+            written += await asyncio.to_thread(self._flush, rows)
+        if skipped:
+            print(f"[FlightStore] Пропущено записей без id, региона или даты: {skipped}")
+        return written
+
+    def _watermarks_path(self) -> str:
+        return os.path.join(self.root, "watermarks.json")
+
+    def load_watermarks(self) -> Dict[int, date]:
+        try:
+            with open(self._watermarks_path(), encoding="utf-8") as f:
+                return {int(region_id): date.fromisoformat(day) for region_id, day in json.load(f).items()}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"[FlightStore] Не удалось прочитать отметки синхронизации: {e}")
+            return {}
+
+    def save_watermarks(self, watermarks: Dict[int, date]):
+        os.makedirs(self.root, exist_ok=True)
+        path = self._watermarks_path()
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({str(region_id): day.isoformat() for region_id, day in watermarks.items()}, f)
+        os.replace(f"{path}.tmp", path)
+
+    async def sync(
+        self,
+        client,
+        region_ids: Iterable[int],
+        overlap_days: int = FLIGHT_SYNC_OVERLAP_DAYS,
+        concurrency: int = FLIGHT_SYNC_CONCURRENCY
+    ) -> Dict[int, int]:
+        # Для каждого региона качаем только полёты новее его отметки (минус окно на поздние правки),
+        # повторы по id перезаписываются в append, так что окно не даёт дублей.
+        watermarks = self.load_watermarks()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def sync_region(region_id: int) -> int:
+            async with semaphore:
+                mark = watermarks.get(region_id)
+                date_from = (mark - timedelta(days=overlap_days)).isoformat() if mark else None
+                written = await self.ingest(client, date_from=date_from, region_ids=[region_id])
+                last_day = await asyncio.to_thread(self.last_day, region_id)
+                if last_day and (mark is None or last_day > mark):
+                    watermarks[region_id] = last_day
+                    self.save_watermarks(watermarks)
+                return written
+
+        region_ids = [int(region_id) for region_id in region_ids]
+        results = await asyncio.gather(*(sync_region(region_id) for region_id in region_ids), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        for error in errors:
+            print(f"[FlightStore] Ошибка синхронизации: {error}")
+        if errors and len(errors) == len(results):
+            raise errors[0]
+        return {
+            region_id: result for region_id, result in zip(region_ids, results)
+            if not isinstance(result, Exception)
+        }
+
+    def daily_series(self, region_id: int, date_from: date, date_to: date) -> Dict[str, np.ndarray]:
+        records = self.read(region_id, date_from, date_to)
+        start, length = day_number(date_from), (date_to - date_from).days + 1
+        offsets = records["day"] - start
+        series = {"all": np.bincount(offsets, minlength=length)[:length]}
+        for code, kind in enumerate(KIND_NAMES):
+            series[kind] = np.bincount(offsets[records["kind"] == code], minlength=length)[:length]
+        return series
+
+    def last_day(self, region_id: int) -> Optional[date]:
+        months = self.months(region_id)
+        if not months:
+            return None
+        return day_to_date(self.read_partition(region_id, months[-1])["day"].max())
+
+
+flight_store = FlightStore()
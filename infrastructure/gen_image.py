@@ -1,9 +1,47 @@
-import matplotlib.pyplot as plt
+from matplotlib import style
+from matplotlib.figure import Figure
 from PIL import Image, ImageDraw, ImageFont
+from functools import lru_cache
+from typing import Dict, List, Optional
 import io
 import numpy as np
 
 
+# Фигуры живут всё время работы процесса (в пуле рендеринга — воркера): создание фигуры с холстом
+# и первая загрузка шрифтов стоят дороже самой отрисовки. Между вызовами фигура только очищается.
+_FIGURES: Dict[str, Figure] = {}
+_FIGSIZES = {"bas_usage": (8, 8), "flights_trend": (10, 6), "trend_line": (8, 4)}
+
+
+def _figure(name: str) -> Figure:
+    fig = _FIGURES.get(name)
+    if fig is None:
+        fig = _FIGURES[name] = Figure(figsize=_FIGSIZES[name])
+    fig.clear()
+    fig.set_size_inches(_FIGSIZES[name])
+    return fig
+
+
+@lru_cache(maxsize=None)
+def _font(size: int, bold: bool = False):
+    names = ("DejaVuSans-Bold.ttf", "Arial Bold.ttf") if bold else ("DejaVuSans.ttf", "Arial.ttf")
+    for name in names:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def warm_up():
+    # инициализатор воркера: стиль, фигуры и шрифты готовятся до первого запроса
+    style.use('default')
+    for name in _FIGSIZES:
+        _figure(name).savefig(io.BytesIO(), format='PNG')
+    for size in (10, 12, 14, 16, 32):
+        _font(size), _font(size, bold=True)
+
+
 def generate_bas_usage_chart(data: dict) -> bytes:
     labels = list(data.keys())
     sizes = list(data.values())
@@ -20,8 +58,8 @@ def generate_bas_usage_chart(data: dict) -> bytes:
         '#ffffff'   
     ]
 
-    plt.style.use('default')
-    fig, ax = plt.subplots(figsize=(8, 8))
+    fig = _figure("bas_usage")
+    ax = fig.subplots()
 
     wedges, texts, autotexts = ax.pie(
         sizes, 
@@ -39,18 +77,9 @@ def generate_bas_usage_chart(data: dict) -> bytes:
     ax.axis('equal')
 
     buf = io.BytesIO()
-    plt.savefig(buf, format='PNG', dpi=150, bbox_inches='tight')
-    buf.seek(0)
-
-    image_bytes = buf.getvalue()
-
-    plt.close(fig)
-
-    return image_bytes
-
+    fig.savefig(buf, format='PNG', dpi=150, bbox_inches='tight')
+    return buf.getvalue()
 
-from PIL import Image, ImageDraw, ImageFont
-import io
 
 def generate_flights_cards(flights_data: list) -> bytes:
     card_width = 300
@@ -65,19 +94,9 @@ def generate_flights_cards(flights_data: list) -> bytes:
     img = Image.new("RGB", (total_width, total_height), "white")
     draw = ImageDraw.Draw(img)
 
-    try:
-        font_title = ImageFont.truetype("DejaVuSans-Bold.ttf", 14)
-        font_text = ImageFont.truetype("DejaVuSans.ttf", 12)
-        font_small = ImageFont.truetype("DejaVuSans.ttf", 10)
-    except OSError:
-        try:
-            font_title = ImageFont.truetype("Arial.ttf", 14)
-            font_text = ImageFont.truetype("Arial.ttf", 12)
-            font_small = ImageFont.truetype("Arial.ttf", 10)
-        except OSError:
-            font_title = ImageFont.load_default()
-            font_text = ImageFont.load_default()
-            font_small = ImageFont.load_default()
+    font_title = _font(14, bold=True)
+    font_text = _font(12)
+    font_small = _font(10)
 
     card_bg = "#f5f5f5"
     text_color = "#333333"
@@ -131,12 +150,8 @@ def generate_regions_table(regions_data: list) -> bytes:
     img = Image.new("RGB", (total_width, total_height), "white")
     draw = ImageDraw.Draw(img)
 
-    try:
-        font_header = ImageFont.truetype("DejaVuSans-Bold.ttf", 14)
-        font_row = ImageFont.truetype("DejaVuSans.ttf", 12)
-    except IOError:
-        font_header = ImageFont.load_default()
-        font_row = ImageFont.load_default()
+    font_header = _font(14, bold=True)
+    font_row = _font(12)
 
     header_bg = "#f0f0f0"
     row_bg_1 = "#ffffff"
@@ -198,8 +213,8 @@ def generate_flights_trend_chart(data: list, stats: dict) -> bytes:
     dates = [item["date"] for item in data]
     flights = [item["flights"] for item in data]
 
-    plt.style.use('default')
-    fig, ax = plt.subplots(figsize=(10, 6))
+    fig = _figure("flights_trend")
+    ax = fig.subplots()
 
     line_color = '#007acc'     
     fill_color = '#e6f2ff'     
@@ -227,8 +242,7 @@ def generate_flights_trend_chart(data: list, stats: dict) -> bytes:
 
 
     buf = io.BytesIO()
-    plt.savefig(buf, format='PNG', dpi=150, bbox_inches='tight')
-    plt.close(fig)
+    fig.savefig(buf, format='PNG', dpi=150, bbox_inches='tight')
 
     chart_img = Image.open(buf)
     width, height = chart_img.size
@@ -240,14 +254,9 @@ def generate_flights_trend_chart(data: list, stats: dict) -> bytes:
 
     draw = ImageDraw.Draw(final_img)
 
-    try:
-        font_title = ImageFont.truetype("DejaVuSans-Bold.ttf", 14)
-        font_value = ImageFont.truetype("DejaVuSans.ttf", 32)
-        font_unit = ImageFont.truetype("DejaVuSans.ttf", 16)
-    except:
-        font_title = ImageFont.load_default()
-        font_value = ImageFont.load_default()
-        font_unit = ImageFont.load_default()
+    font_title = _font(14, bold=True)
+    font_value = _font(32)
+    font_unit = _font(16)
 
     card_width = width // 3
     y_pos = height + 10
@@ -272,4 +281,28 @@ def generate_flights_trend_chart(data: list, stats: dict) -> bytes:
 
     buf_final = io.BytesIO()
     final_img.save(buf_final, format="PNG")
-    return buf_final.getvalue()
\ No newline at end of file
+    return buf_final.getvalue()
+
+
+def generate_trend_line_chart(flight_counts: List[int], labels: Optional[List[str]] = None) -> bytes:
+    if not flight_counts:
+        raise ValueError("Список flight_counts не должен быть пустым")
+
+    n = len(flight_counts)
+    if labels is None:
+        labels = [str(i + 1) for i in range(n)]
+    elif len(labels) != n:
+        raise ValueError("Длина labels должна совпадать с длиной flight_counts")
+
+    fig = _figure("trend_line")
+    ax = fig.subplots()
+    ax.plot(labels, flight_counts, marker='o', linestyle='-', linewidth=2, markersize=6, color='#1f77b4')
+    ax.set_title('Динамика количества полётов', fontsize=14)
+    ax.set_xlabel('Период', fontsize=12)
+    ax.set_ylabel('Количество полётов', fontsize=12)
+    ax.grid(True, linestyle='--', alpha=0.6)
+    fig.tight_layout()
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=150, bbox_inches='tight')
+    return buf.getvalue()
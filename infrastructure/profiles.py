@@ -0,0 +1,77 @@
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from infrastructure.api_clients.catalog import catalog
+from infrastructure.dataset import dataset
+from infrastructure.duration_sketch import duration_index
+from infrastructure.ranking import ranking
+
+
+@dataclass(slots=True)
+class RegionProfile:
+    id: int
+    name: str
+    capital: Optional[str]
+    type: Optional[str]
+    population: Optional[str]
+    rank: Optional[int]
+    rank_delta: Optional[int]
+    total_flights: Optional[int]
+    year: Optional[int]
+    year_flights: Optional[int]
+    avg_duration: Optional[int]
+    durations: Dict[str, Optional[int]] = field(default_factory=dict)
+    all_durations: Dict[str, Optional[int]] = field(default_factory=dict)  # за всё время, для таблицы рейтинга
+    month: Optional[Dict] = None
+
+
+def build_profile(region: Dict) -> RegionProfile:
+    region_id = region["id"]
+    statistic = dataset.statistics.get(region_id)
+    rank = ranking.rank(region_id)
+    years = statistic.all_flights_years if statistic else []
+    last_year = years[-1] if years else None
+
+    if last_year is not None:
+        year = last_year.year
+    else:
+        period = duration_index.last_period(region_id)
+        year = int(period[:4]) if period else None
+    durations = duration_index.sketch(region_id, str(year) if year else None).summary()
+
+    return RegionProfile(
+        id=region_id,
+        name=region.get("fullname") or region.get("name") or (statistic.name if statistic else f"ID {region_id}"),
+        capital=(region.get("capital") or {}).get("name"),
+        type=region.get("type"),
+        population=region.get("population"),
+        rank=rank.rank if rank else None,
+        rank_delta=rank.delta if rank else None,
+        total_flights=statistic.total_flights_all if statistic else None,
+        year=year,
+        year_flights=last_year.flight_count if last_year else durations["count"],
+        avg_duration=(last_year.avg_time if last_year and last_year.avg_time else durations["mean"]),
+        durations=durations,
+        all_durations=duration_index.sketch(region_id).summary(),
+        month=dataset.matrix.region_summary(region_id) if dataset.matrix else None
+    )
+
+
+class ProfileStore:
+    # карточки регионов собираются целиком при обновлении данных, запрос пользователя сеть не трогает
+    def __init__(self):
+        self._profiles: Dict[int, RegionProfile] = {}
+        self.updated_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._profiles)
+
+    def rebuild(self):
+        self._profiles = {region["id"]: build_profile(region) for region in catalog.regions}
+        self.updated_at = time.time()
+
+    def get(self, region_id) -> Optional[RegionProfile]:
+        return self._profiles.get(int(region_id))
+
+
+profiles = ProfileStore()
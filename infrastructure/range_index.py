@@ -0,0 +1,95 @@
+import asyncio
+import numpy as np
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+from infrastructure.flight_store import FLIGHT_DTYPE, KIND_NAMES, FlightStore, day_number, day_to_date, flight_store
+
+
+KINDS = ("all",) + KIND_NAMES
+
+
+def window_series(first_day: int, daily: np.ndarray, date_from: date, date_to: date) -> np.ndarray:
+    # дневной ряд [вид, день] с началом first_day, вырезанный по окну и дополненный нулями по краям
+    start, length = day_number(date_from), (date_to - date_from).days + 1
+    result = np.zeros((daily.shape[0], max(length, 0)), dtype=daily.dtype)
+    lo, hi = max(start, first_day), min(start + length, first_day + daily.shape[1])
+    if lo < hi:
+        result[:, lo - start:hi - start] = daily[:, lo - first_day:hi - first_day]
+    return result
+
+
+class RegionPrefixSums:
+    # counts[вид, i] и durations[вид, i] — сумма за дни first_day .. first_day + i - 1, т.е. counts[:, 0] == 0
+    __slots__ = ("first_day", "counts", "durations")
+
+    def __init__(self, records: np.ndarray):
+        self.first_day = int(records["day"].min()) if len(records) else 0
+        length = int(records["day"].max()) - self.first_day + 1 if len(records) else 0
+        offsets = records["day"] - self.first_day
+        self.counts = np.zeros((len(KINDS), length + 1), dtype=np.int64)
+        self.durations = np.zeros((len(KINDS), length + 1), dtype=np.int64)
+        for k, kind in enumerate(KINDS):
+            mask = slice(None) if kind == "all" else records["kind"] == KIND_NAMES.index(kind)
+            daily = np.bincount(offsets[mask], minlength=length)
+            # неизвестная длительность (-1) в сумму не идёт
+            seconds = np.bincount(offsets[mask], weights=np.maximum(records["duration"][mask], 0), minlength=length)
+            np.cumsum(daily, out=self.counts[k, 1:])
+            np.cumsum(seconds.astype(np.int64), out=self.durations[k, 1:])
+
+    @property
+    def last_day(self) -> Optional[date]:
+        length = self.counts.shape[1] - 1
+        return day_to_date(self.first_day + length - 1) if length else None
+
+    def daily(self) -> Tuple[np.ndarray, np.ndarray]:
+        return np.diff(self.counts, axis=1), np.diff(self.durations, axis=1)
+
+    def window(self, date_from: date, date_to: date) -> Tuple[np.ndarray, np.ndarray]:
+        counts, durations = self.daily()
+        return (
+            window_series(self.first_day, counts, date_from, date_to),
+            window_series(self.first_day, durations, date_from, date_to)
+        )
+
+    def _position(self, day: int) -> int:
+        return min(max(day - self.first_day, 0), self.counts.shape[1] - 1)
+
+    def query(self, date_from: date, date_to: date) -> Dict[str, Dict[str, int]]:
+        lo = self._position(day_number(date_from))
+        hi = self._position(day_number(date_to) + 1)
+        if hi < lo:
+            hi = lo
+        counts = self.counts[:, hi] - self.counts[:, lo]
+        durations = self.durations[:, hi] - self.durations[:, lo]
+        return {
+            kind: {"flights": int(counts[k]), "duration": int(durations[k])}
+            for k, kind in enumerate(KINDS)
+        }
+
+
+class RangeIndex:
+    # префиксные суммы по дням для каждого региона: любой период считается двумя вычитаниями
+    def __init__(self, store: FlightStore = flight_store):
+        self.store = store
+        self._regions: Dict[int, RegionPrefixSums] = {}
+        self._empty = RegionPrefixSums(np.empty(0, dtype=FLIGHT_DTYPE))
+
+    def _build(self, region_ids: Iterable[int]) -> Dict[int, RegionPrefixSums]:
+        return {int(region_id): RegionPrefixSums(self.store.read(int(region_id))) for region_id in region_ids}
+
+    def rebuild(self, region_ids: Iterable[int]):
+        self._regions.update(self._build(region_ids))
+
+    async def update(self, region_ids: Iterable[int]):
+        # чтение хранилища — в потоке; публикуем уже в цикле событий
+        self._regions.update(await asyncio.to_thread(self._build, list(region_ids)))
+
+    def get(self, region_id: int) -> RegionPrefixSums:
+        # регион ещё не проиндексирован (или полётов нет) — пустые суммы, хранилище на запросе не читаем
+        return self._regions.get(int(region_id), self._empty)
+
+    def query(self, region_id: int, date_from: date, date_to: date) -> Dict[str, Dict[str, int]]:
+        return self.get(region_id).query(date_from, date_to)
+
+
+range_index = RangeIndex()
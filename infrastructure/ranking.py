@@ -0,0 +1,116 @@
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+from infrastructure.api_clients.models import Statistic
+
+
+METRICS = ("total", "last_year", "hours", "yoy", "per_capita")
+
+
+@dataclass(slots=True)
+class RankEntry:
+    region_id: int
+    value: float
+    rank: int
+    delta: Optional[int]
+
+
+def region_metrics(statistic: Statistic, population: Optional[int]) -> Dict[str, Optional[float]]:
+    years = statistic.all_flights_years
+    last_year = years[-1].flight_count if years else 0
+    yoy = None
+    if len(years) > 1 and years[-2].flight_count:
+        yoy = (years[-1].flight_count - years[-2].flight_count) * 100 / years[-2].flight_count
+    return {
+        "total": statistic.total_flights_all,
+        "last_year": last_year,
+        "hours": sum(year.total_time for year in years) / 3600,
+        "yoy": yoy,
+        "per_capita": statistic.total_flights_all * 100000 / population if population else None
+    }
+
+
+class MetricRanking:
+    def __init__(self):
+        # (-значение, id региона) по возрастанию: первым идёт лидер, при равенстве — меньший id
+        self._order: List[Tuple[float, int]] = []
+        self._values: Dict[int, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def update(self, region_id: int, value: Optional[float]):
+        old = self._values.pop(region_id, None)
+        if old is not None:
+            del self._order[bisect_left(self._order, (-old, region_id))]
+        if value is not None:
+            self._values[region_id] = value
+            insort(self._order, (-value, region_id))
+
+    def rank(self, region_id: int) -> Optional[int]:
+        value = self._values.get(region_id)
+        if value is None:
+            return None
+        return bisect_left(self._order, (-value, region_id)) + 1
+
+    def value(self, region_id: int) -> Optional[float]:
+        return self._values.get(region_id)
+
+    def top(self, k: int) -> List[Tuple[int, float]]:
+        return [(region_id, -value) for value, region_id in self._order[:k]]
+
+    def ranks(self) -> Dict[int, int]:
+        return {region_id: position for position, (_, region_id) in enumerate(self._order, 1)}
+
+
+class RankingEngine:
+    def __init__(self):
+        self._rankings: Dict[str, MetricRanking] = {metric: MetricRanking() for metric in METRICS}
+        self._previous: Dict[str, Dict[int, int]] = {metric: {} for metric in METRICS}
+        self._metrics: Dict[int, Dict[str, Optional[float]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._metrics)
+
+    def update_region(self, region_id: int, metrics: Dict[str, Optional[float]]) -> bool:
+        # переранжируется только регион, у которого поменялись показатели
+        if self._metrics.get(region_id) == metrics:
+            return False
+        self._metrics[region_id] = metrics
+        for metric, ranking in self._rankings.items():
+            ranking.update(region_id, metrics.get(metric))
+        return True
+
+    def snapshot(self):
+        self._previous = {metric: ranking.ranks() for metric, ranking in self._rankings.items()}
+
+    def apply(self, statistics: Iterable[Statistic], populations: Dict[int, int]) -> int:
+        changed = {}
+        for statistic in statistics:
+            metrics = region_metrics(statistic, populations.get(statistic.id))
+            if self._metrics.get(statistic.id) != metrics:
+                changed[statistic.id] = metrics
+        if changed:
+            # дельты считаются относительно последнего состояния, в котором что-то менялось
+            self.snapshot()
+            for region_id, metrics in changed.items():
+                self.update_region(region_id, metrics)
+        return len(changed)
+
+    def rank(self, region_id: int, metric: str = "total") -> Optional[RankEntry]:
+        ranking = self._rankings[metric]
+        rank = ranking.rank(region_id)
+        if rank is None:
+            return None
+        previous = self._previous[metric].get(region_id)
+        return RankEntry(region_id, ranking.value(region_id), rank, None if previous is None else previous - rank)
+
+    def top(self, k: int, metric: str = "total") -> List[RankEntry]:
+        previous = self._previous[metric]
+        return [
+            RankEntry(region_id, value, rank, None if previous.get(region_id) is None else previous[region_id] - rank)
+            for rank, (region_id, value) in enumerate(self._rankings[metric].top(k), 1)
+        ]
+
+
+ranking = RankingEngine()
@@ -0,0 +1,100 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+from configuration.config import RENDER_QUEUE_LIMIT, RENDER_TIMEOUT, RENDER_WORKERS
+from infrastructure import gen_image
+from infrastructure.chart_cache import chart_cache, chart_key
+
+
+class RenderError(Exception):
+    pass
+
+
+class RenderBusy(RenderError):
+    pass
+
+
+class RenderTimeout(RenderError):
+    pass
+
+
+class RenderService:
+    # Отрисовка графиков в отдельных процессах: matplotlib и Pillow держат GIL сотни миллисекунд,
+    # а в пуле цикл событий бота продолжает обрабатывать апдейты. Функции передаются по ссылке,
+    # поэтому рисовать можно только функциями уровня модуля (например, из gen_image).
+    def __init__(self, workers: int = RENDER_WORKERS, queue_limit: int = RENDER_QUEUE_LIMIT, timeout: float = RENDER_TIMEOUT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+
+    def _create_executor(self) -> Executor:
+        # spawn, а не fork: в процессе бота уже крутятся цикл событий и сетевые сессии
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=gen_image.warm_up
+        )
+
+    def start(self):
+        if isinstance(self._executor, ProcessPoolExecutor):
+            return
+        chart_cache.load()
+        self._executor = self._create_executor()
+        # первая задача поднимает воркеров сразу, а не на первом запросе пользователя
+        self._executor.submit(int)
+        print(f"[Render] Пул отрисовки запущен: {self.workers} процессов")
+
+    async def stop(self):
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            await asyncio.to_thread(executor.shutdown, True, cancel_futures=True)
+
+    def _release(self, _future):
+        self._pending -= 1
+
+    async def render(self, func: Callable[..., bytes], *args, **kwargs) -> bytes:
+        # повторная отрисовка тех же данных — поиск в кэше графиков, в пул уходят только промахи
+        key = chart_key(func, args, kwargs)
+        return await chart_cache.get_or_render(key, lambda: self._render(func, *args, **kwargs))
+
+    async def _render(self, func: Callable[..., bytes], *args, **kwargs) -> bytes:
+        if self._pending >= self.queue_limit:
+            raise RenderBusy(f"В очереди отрисовки уже {self._pending} задач")
+        if self._executor is None:
+            # пул не запущен (скрипты, отладка): один поток, т.к. фигуры gen_image не потокобезопасны
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="render")
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._executor.submit(func, *args, **kwargs)
+        except BrokenProcessPool:
+            self._restart()
+            raise RenderError("Пул отрисовки перезапущен, повторите запрос")
+        # место в очереди освобождается, когда задача действительно завершилась,
+        # а не когда её перестали ждать по таймауту
+        self._pending += 1
+        future.add_done_callback(lambda done: loop.call_soon_threadsafe(self._release, done))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            raise RenderTimeout(f"Отрисовка {func.__name__} дольше {self.timeout} с")
+        except BrokenProcessPool:
+            self._restart()
+            raise RenderError("Воркер отрисовки упал, пул перезапущен")
+
+    def _restart(self):
+        executor = self._executor
+        print("[Render] Пул отрисовки сломан, перезапуск")
+        self._executor = self._create_executor()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {"workers": self.workers, "pending": self._pending, "queue_limit": self.queue_limit, **chart_cache.stats()}
+
+
+render_service = RenderService()
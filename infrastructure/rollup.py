@@ -0,0 +1,181 @@
+import numpy as np
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from infrastructure.dataset import dataset
+from infrastructure.duration_sketch import DurationSketch, duration_index
+from infrastructure.flight_store import day_to_date
+from infrastructure.range_index import KINDS, range_index, window_series
+
+
+RF_KEY = "rf"
+UNKNOWN_DISTRICT = "Без округа"
+
+
+def district_key(name: str) -> str:
+    return f"district:{name}"
+
+
+@dataclass(slots=True)
+class Aggregate:
+    flights: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(KINDS, 0))
+    duration: int = 0                                      # секунды, по годовой статистике API
+    years: Dict[int, int] = field(default_factory=dict)   # год -> полётов
+    sketch: DurationSketch = field(default_factory=DurationSketch)
+    first_day: int = 0
+    daily_counts: np.ndarray = field(default_factory=lambda: np.zeros((len(KINDS), 0), dtype=np.int64))
+    daily_durations: np.ndarray = field(default_factory=lambda: np.zeros((len(KINDS), 0), dtype=np.int64))
+
+    def _extend(self, first_day: int, length: int):
+        if not self.daily_counts.shape[1]:
+            self.first_day = first_day
+        start = min(self.first_day, first_day)
+        end = max(self.first_day + self.daily_counts.shape[1], first_day + length)
+        if start == self.first_day and end == self.first_day + self.daily_counts.shape[1]:
+            return
+        offset = self.first_day - start
+        for name in ("daily_counts", "daily_durations"):
+            old = getattr(self, name)
+            new = np.zeros((len(KINDS), end - start), dtype=np.int64)
+            new[:, offset:offset + old.shape[1]] = old
+            setattr(self, name, new)
+        self.first_day = start
+
+    def add(self, other: "Aggregate", sign: int = 1):
+        for kind in KINDS:
+            self.flights[kind] += sign * other.flights[kind]
+        self.duration += sign * other.duration
+        for year, count in other.years.items():
+            self.years[year] = self.years.get(year, 0) + sign * count
+            if not self.years[year]:
+                del self.years[year]
+        if sign > 0:
+            self.sketch.merge(other.sketch)
+        else:
+            self.sketch.subtract(other.sketch)
+
+        length = other.daily_counts.shape[1]
+        if length:
+            self._extend(other.first_day, length)
+            offset = other.first_day - self.first_day
+            self.daily_counts[:, offset:offset + length] += sign * other.daily_counts
+            self.daily_durations[:, offset:offset + length] += sign * other.daily_durations
+
+    @property
+    def last_day(self) -> Optional[date]:
+        active = np.flatnonzero(self.daily_counts[0])
+        return day_to_date(self.first_day + int(active[-1])) if active.size else None
+
+    def window(self, date_from: date, date_to: date) -> Tuple[np.ndarray, np.ndarray]:
+        return (
+            window_series(self.first_day, self.daily_counts, date_from, date_to),
+            window_series(self.first_day, self.daily_durations, date_from, date_to)
+        )
+
+
+def region_aggregate(region_id: int) -> Aggregate:
+    aggregate = Aggregate()
+    statistic = dataset.statistics.get(region_id)
+    if statistic is not None:
+        aggregate.flights = {
+            "all": statistic.total_flights_all,
+            "fiz": statistic.total_flights_fiz,
+            "yur": statistic.total_flights_yur
+        }
+        aggregate.duration = sum(year.total_time for year in statistic.all_flights_years)
+        aggregate.years = {
+            year.year: year.flight_count for year in statistic.all_flights_years if year.year and year.flight_count
+        }
+    aggregate.sketch = duration_index.sketch(region_id)
+
+    sums = range_index.get(region_id)
+    aggregate.first_day = sums.first_day
+    aggregate.daily_counts, aggregate.daily_durations = sums.daily()
+    return aggregate
+
+
+@dataclass(slots=True)
+class RollupNode:
+    key: str
+    name: str
+    parent: Optional["RollupNode"] = None
+    children: List["RollupNode"] = field(default_factory=list)
+    aggregate: Aggregate = field(default_factory=Aggregate)
+
+    @property
+    def region_count(self) -> int:
+        return sum(child.region_count for child in self.children) if self.children else 1
+
+
+class RollupTree:
+    # регион -> федеральный округ -> РФ; изменение региона правит только его предков разностью
+    def __init__(self):
+        self.root = RollupNode(RF_KEY, "Российская Федерация")
+        self._nodes: Dict[str, RollupNode] = {RF_KEY: self.root}
+        self._regions: Dict[int, RollupNode] = {}
+
+    def build(self, regions: Iterable[Dict]):
+        root = RollupNode(RF_KEY, "Российская Федерация")
+        nodes = {RF_KEY: root}
+        leaves = {}
+        for region in regions:
+            district = region.get("district") or UNKNOWN_DISTRICT
+            parent = nodes.get(district_key(district))
+            if parent is None:
+                parent = nodes[district_key(district)] = RollupNode(district_key(district), f"{district} ФО", root)
+                root.children.append(parent)
+            leaf = RollupNode(str(region["id"]), region.get("fullname") or region.get("name"), parent)
+            parent.children.append(leaf)
+            leaves[region["id"]] = leaf
+        self.root, self._nodes, self._regions = root, nodes, leaves
+        self.update_regions(leaves)
+
+    def update_region(self, region_id: int, aggregate: Optional[Aggregate] = None):
+        leaf = self._regions.get(int(region_id))
+        if leaf is None:
+            return
+        aggregate = region_aggregate(int(region_id)) if aggregate is None else aggregate
+        old, leaf.aggregate = leaf.aggregate, aggregate
+        node = leaf.parent
+        while node is not None:
+            node.aggregate.add(old, -1)
+            node.aggregate.add(aggregate)
+            node.aggregate.sketch.max = max((child.aggregate.sketch.max for child in node.children), default=0)
+            node = node.parent
+
+    def update_regions(self, region_ids: Iterable[int]):
+        for region_id in region_ids:
+            self.update_region(region_id)
+
+    def get(self, key: str) -> Optional[RollupNode]:
+        return self._nodes.get(key)
+
+    def district_of(self, region_id: int) -> Optional[RollupNode]:
+        leaf = self._regions.get(int(region_id))
+        return leaf.parent if leaf else None
+
+    def report(self, key: str, days: int = 31) -> Optional[Dict]:
+        node = self.get(key)
+        if node is None:
+            return None
+        aggregate = node.aggregate
+        date_to = aggregate.last_day or date.today()
+        date_from = date_to - timedelta(days=days - 1)
+        counts, _ = aggregate.window(date_from, date_to)
+        return {
+            "name": node.name,
+            "regions": node.region_count,
+            "summary": {
+                "total_flights": dict(aggregate.flights),
+                "total_hours": round(aggregate.duration / 3600, 1)
+            },
+            "by_year": [{"year": year, "flight_count": count} for year, count in sorted(aggregate.years.items())],
+            "durations": aggregate.sketch.summary(),
+            "daily": [
+                {"date": (date_from + timedelta(days=i)).isoformat(), **{kind: int(counts[k, i]) for k, kind in enumerate(KINDS)}}
+                for i in range(counts.shape[1])
+            ]
+        }
+
+
+rollup = RollupTree()
@@ -0,0 +1,90 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+from configuration.config import REFRESH_CONCURRENCY, REFRESH_JITTER
+
+
+@dataclass(slots=True)
+class Job:
+    name: str
+    func: Callable[[], Awaitable[None]]
+    interval: float
+    jitter: float
+    run_at_start: bool
+    last_success: Optional[float] = None
+    last_duration: Optional[float] = None
+    runs: int = 0
+    failures: int = 0
+
+
+class RefreshScheduler:
+    def __init__(self, concurrency: int = REFRESH_CONCURRENCY):
+        self._jobs: Dict[str, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    def add_job(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[None]],
+        interval: float,
+        jitter: float = REFRESH_JITTER,
+        run_at_start: bool = True
+    ):
+        self._jobs[name] = Job(name, func, interval, jitter, run_at_start)
+
+    def start(self):
+        for job in self._jobs.values():
+            self._tasks.append(asyncio.create_task(self._loop(job), name=f"refresh:{job.name}"))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def _delay(self, job: Job) -> float:
+        # разносим запуски, чтобы задачи с одинаковым интервалом не били по API одновременно
+        return max(0.0, job.interval * (1 + random.uniform(-job.jitter, job.jitter)))
+
+    async def _loop(self, job: Job):
+        if not job.run_at_start:
+            await asyncio.sleep(self._delay(job))
+        while True:
+            await self.run_job(job.name)
+            await asyncio.sleep(self._delay(job))
+
+    async def run_job(self, name: str):
+        job = self._jobs[name]
+        async with self._semaphore:
+            started = time.monotonic()
+            job.runs += 1
+            try:
+                await job.func()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job.failures += 1
+                print(f"[Scheduler] Обновление {name} завершилось ошибкой (данные устарели на {self._staleness(job)}): {e!r}")
+                return
+            job.last_duration = time.monotonic() - started
+            print(f"[Scheduler] Обновление {name} заняло {job.last_duration:.2f} с (данные были устаревшими на {self._staleness(job)})")
+            job.last_success = time.time()
+
+    def _staleness(self, job: Job) -> str:
+        if job.last_success is None:
+            return "—"
+        return f"{time.time() - job.last_success:.0f} с"
+
+    def status(self) -> Dict[str, Dict]:
+        return {
+            job.name: {
+                "runs": job.runs,
+                "failures": job.failures,
+                "last_duration": job.last_duration,
+                "staleness": None if job.last_success is None else time.time() - job.last_success
+            }
+            for job in self._jobs.values()
+        }
@@ -0,0 +1,229 @@
+import asyncio
+import math
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Tuple
+from configuration.config import CITY_MATCH_MAX_KM, SPATIAL_CELL_DEG
+from infrastructure.flight_store import FlightStore, flight_store
+
+
+EARTH_RADIUS_KM = 6371.0
+MAX_RINGS = 6
+CHUNK_SIZE = 50_000
+BRUTE_FORCE_CHUNK = 4096
+
+
+def _unit_vectors(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    lat, lon = np.radians(lat), np.radians(lon)
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=1)
+
+
+def _chord2_to_km(chord2: np.ndarray) -> np.ndarray:
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(np.sqrt(np.maximum(chord2, 0)) / 2, 1))
+
+
+def _km_to_chord2(km: np.ndarray) -> np.ndarray:
+    return (2 * np.sin(np.minimum(np.asarray(km) / EARTH_RADIUS_KM, math.pi) / 2)) ** 2
+
+
+def _ring_offsets(ring: int) -> List[Tuple[int, int]]:
+    if ring == 0:
+        return [(0, 0)]
+    return [
+        (dlat, dlon)
+        for dlat in range(-ring, ring + 1)
+        for dlon in range(-ring, ring + 1)
+        if max(abs(dlat), abs(dlon)) == ring
+    ]
+
+
+def _parse_coordinate(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class CityIndex:
+    # Сетка по широте/долготе: города отсортированы по ключу ячейки, ячейка — отрезок [start, end)
+    # в этом порядке (CSR). Расстояния считаем по хордам единичных векторов.
+    def __init__(self, cities: List[Dict], cell_deg: float = SPATIAL_CELL_DEG):
+        lat = np.array([_parse_coordinate(city.get("lat")) for city in cities], dtype=np.float64)
+        lon = np.array([_parse_coordinate(city.get("lon")) for city in cities], dtype=np.float64)
+        valid = np.isfinite(lat) & np.isfinite(lon)
+        self.cities = [city for city, ok in zip(cities, valid) if ok]
+        self.cell_deg = cell_deg
+        self.n_lat = int(math.ceil(180 / cell_deg))
+        self.n_lon = int(math.ceil(360 / cell_deg))
+
+        lat, lon = lat[valid], lon[valid]
+        keys = self._cell_keys(*self._cells(lat, lon))
+        self._order = np.argsort(keys, kind="stable")
+        self._vectors = _unit_vectors(lat, lon)[self._order]
+        # начало каждой ячейки в отсортированном массиве; ячейка k — города [cell_start[k], cell_start[k + 1])
+        self._cell_start = np.searchsorted(keys[self._order], np.arange(self.n_lat * self.n_lon + 1))
+
+    def __len__(self) -> int:
+        return len(self.cities)
+
+    def _cells(self, lat: np.ndarray, lon: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        lat_cell = np.clip(np.floor((lat + 90) / self.cell_deg), 0, self.n_lat - 1).astype(np.int64)
+        lon_cell = np.floor((lon + 180) / self.cell_deg).astype(np.int64) % self.n_lon
+        return lat_cell, lon_cell
+
+    def _cell_keys(self, lat_cell: np.ndarray, lon_cell: np.ndarray) -> np.ndarray:
+        return lat_cell * self.n_lon + lon_cell % self.n_lon
+
+    def _gather(self, points: np.ndarray, lat_cell: np.ndarray, lon_cell: np.ndarray):
+        # все пары (точка, город) из указанной ячейки каждой точки
+        inside = (lat_cell >= 0) & (lat_cell < self.n_lat)
+        points = points[inside]
+        keys = self._cell_keys(lat_cell[inside], lon_cell[inside])
+        start = self._cell_start[keys]
+        counts = self._cell_start[keys + 1] - start
+        total = int(counts.sum())
+        if not total:
+            return points[:0], points[:0]
+        point_index = np.repeat(points, counts)
+        position = np.repeat(start - np.cumsum(counts) + counts, counts) + np.arange(total)
+        return point_index, position
+
+    def _nearest_chunk(self, lat: np.ndarray, lon: np.ndarray, max_rings: int) -> Tuple[np.ndarray, np.ndarray]:
+        size = len(lat)
+        vectors = _unit_vectors(lat, lon)
+        best = np.full(size, np.inf)
+        best_position = np.full(size, -1, dtype=np.int64)
+        lat_cell, lon_cell = self._cells(lat, lon)
+
+        # расстояние от точки до края её ячейки — с каждым кольцом гарантированный радиус растёт на ячейку
+        lat_edge = np.minimum(lat + 90 - lat_cell * self.cell_deg, (lat_cell + 1) * self.cell_deg - lat - 90)
+        lon_offset = np.mod(lon + 180, 360) - (np.mod(lon + 180, 360) // self.cell_deg) * self.cell_deg
+        lon_edge = np.minimum(lon_offset, self.cell_deg - lon_offset)
+
+        pending = np.arange(size)
+        for ring in range(max_rings + 1):
+            for dlat, dlon in _ring_offsets(ring):
+                point_index, position = self._gather(pending, lat_cell[pending] + dlat, lon_cell[pending] + dlon)
+                if not point_index.size:
+                    continue
+                chord2 = 2 - 2 * np.einsum("ij,ij->i", vectors[point_index], self._vectors[position])
+                # пары уже сгруппированы по точке (np.repeat сохраняет порядок): минимум группы без сортировки
+                starts = np.flatnonzero(np.r_[True, point_index[1:] != point_index[:-1]])
+                group = np.cumsum(np.r_[False, point_index[1:] != point_index[:-1]])
+                minimal = np.flatnonzero(chord2 == np.minimum.reduceat(chord2, starts)[group])
+                minimal = minimal[np.r_[True, group[minimal][1:] != group[minimal][:-1]]]
+                points, chord2, position = point_index[minimal], chord2[minimal], position[minimal]
+                better = chord2 < best[points]
+                best[points[better]] = chord2[better]
+                best_position[points[better]] = position[better]
+
+            # хорда² = 4·sin²(Δφ/2) + 4·cosφ1·cosφ2·sin²(Δλ/2): нижние оценки для городов вне кольца
+            lat_margin = lat_edge[pending] + ring * self.cell_deg
+            widest = np.radians(np.minimum(np.abs(lat[pending]) + lat_margin, 90))
+            lon_margin = np.radians(np.minimum(lon_edge[pending] + ring * self.cell_deg, 180))
+            guaranteed = np.minimum(
+                4 * np.sin(np.radians(lat_margin) / 2) ** 2,
+                4 * (np.cos(widest) * np.sin(lon_margin / 2)) ** 2
+            )
+            pending = pending[best[pending] > guaranteed]
+            if not pending.size:
+                break
+
+        # редкие точки вдали от городов (или у полюса): честный перебор небольшими пачками
+        for i in range(0, pending.size, BRUTE_FORCE_CHUNK):
+            batch = pending[i:i + BRUTE_FORCE_CHUNK]
+            chord2 = 2 - 2 * vectors[batch] @ self._vectors.T
+            best_position[batch] = chord2.argmin(axis=1)
+            best[batch] = chord2[np.arange(batch.size), best_position[batch]]
+        return self._order[best_position], _chord2_to_km(best)
+
+    def nearest(self, lat, lon, max_rings: int = MAX_RINGS) -> Tuple[np.ndarray, np.ndarray]:
+        # индексы ближайших городов в self.cities и расстояния до них в км
+        lat, lon = np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+        if not len(self.cities) or not lat.size:
+            return np.full(lat.size, -1, dtype=np.int64), np.full(lat.size, np.inf)
+        parts = [
+            self._nearest_chunk(lat[i:i + CHUNK_SIZE], lon[i:i + CHUNK_SIZE], max_rings)
+            for i in range(0, lat.size, CHUNK_SIZE)
+        ]
+        return np.concatenate([part[0] for part in parts]), np.concatenate([part[1] for part in parts])
+
+    def within(self, lat, lon, radius_km: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # города в радиусе от каждой точки в виде CSR: города точки i — cities[offsets[i]:offsets[i + 1]]
+        lat, lon = np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+        if not len(self.cities) or not lat.size:
+            return np.zeros(lat.size + 1, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+        radius_deg = math.degrees(radius_km / EARTH_RADIUS_KM)
+        lat_span = int(math.ceil(radius_deg / self.cell_deg))
+        widest = math.radians(min(float(np.abs(lat).max()) + radius_deg, 89.9))
+        lon_span = min(int(math.ceil(radius_deg / (self.cell_deg * math.cos(widest)))), (self.n_lon - 1) // 2)
+
+        vectors = _unit_vectors(lat, lon)
+        lat_cell, lon_cell = self._cells(lat, lon)
+        threshold = _km_to_chord2(radius_km)
+        everyone = np.arange(lat.size)
+        found_points, found_positions, found_chord2 = [], [], []
+        for dlat in range(-lat_span, lat_span + 1):
+            for dlon in range(-lon_span, lon_span + 1):
+                point_index, position = self._gather(everyone, lat_cell + dlat, lon_cell + dlon)
+                if not point_index.size:
+                    continue
+                chord2 = 2 - 2 * np.einsum("ij,ij->i", vectors[point_index], self._vectors[position])
+                near = chord2 <= threshold
+                found_points.append(point_index[near])
+                found_positions.append(position[near])
+                found_chord2.append(chord2[near])
+
+        if not found_points:
+            return np.zeros(lat.size + 1, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+        points = np.concatenate(found_points)
+        chord2 = np.concatenate(found_chord2)
+        order = np.lexsort((chord2, points))
+        offsets = np.zeros(lat.size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(points, minlength=lat.size), out=offsets[1:])
+        return offsets, self._order[np.concatenate(found_positions)[order]], _chord2_to_km(chord2[order])
+
+
+class CityDensity:
+    # число полётов, приписанных ближайшему городу (не дальше CITY_MATCH_MAX_KM);
+    # счётчики хранятся по регионам, чтобы после синхронизации пересчитывать только изменённые
+    def __init__(self, store: FlightStore = flight_store):
+        self.store = store
+        self.index: Optional[CityIndex] = None
+        self._cities: Optional[List[Dict]] = None
+        self._region_counts: Dict[int, np.ndarray] = {}
+        self._flights: Dict[int, int] = {}
+
+    def _count_region(self, index: CityIndex, region_id: int, max_km: float) -> np.ndarray:
+        records = self.store.read(region_id)
+        located = np.isfinite(records["lat"]) & np.isfinite(records["lon"])
+        if not located.any():
+            return np.zeros(len(index), dtype=np.int64)
+        nearest, distance = index.nearest(records["lat"][located], records["lon"][located])
+        return np.bincount(nearest[distance <= max_km], minlength=len(index))
+
+    def rebuild(self, cities: List[Dict], region_ids: Optional[Iterable[int]] = None, max_km: float = CITY_MATCH_MAX_KM):
+        # новый список городов (обновился справочник) или первый запуск — пересчёт всего хранилища
+        if self.index is None or cities is not self._cities or region_ids is None:
+            index, region_counts = CityIndex(cities), {}
+            region_ids = self.store.region_ids()
+        else:
+            index, region_counts = self.index, dict(self._region_counts)
+        for region_id in region_ids:
+            region_counts[int(region_id)] = self._count_region(index, int(region_id), max_km)
+
+        counts = np.zeros(len(index), dtype=np.int64)
+        for region_count in region_counts.values():
+            counts += region_count
+        flights = {city["id"]: int(count) for city, count in zip(index.cities, counts)}
+        # публикуем одним набором присваиваний: rebuild идёт в потоке, а flights() читают из цикла событий
+        self.index, self._cities, self._region_counts, self._flights = index, cities, region_counts, flights
+
+    async def update(self, cities: List[Dict], region_ids: Optional[Iterable[int]] = None):
+        await asyncio.to_thread(self.rebuild, cities, None if region_ids is None else list(region_ids))
+
+    def flights(self, city_id) -> Optional[int]:
+        return self._flights.get(city_id) if self.index is not None else None
+
+
+city_density = CityDensity()
@@ -0,0 +1,109 @@
+import numpy as np
+from typing import Dict, Iterable, Optional
+from infrastructure.api_clients.models import Statistic
+
+
+KINDS = ("all", "fiz", "yur")
+
+
+def _growth(current: np.ndarray, previous: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(previous > 0, (current - previous) * 100.0 / previous, np.nan)
+
+
+def _shift(values: np.ndarray, periods: int) -> np.ndarray:
+    shifted = np.zeros_like(values)
+    if periods < values.shape[-1]:
+        shifted[..., periods:] = values[..., :-periods]
+    return shifted
+
+
+def _month_column(year, month) -> Optional[int]:
+    # год и месяц могут прийти строками ("2024", "1") — приводим, мусор пропускаем
+    try:
+        year, month = int(year), int(month)
+    except (TypeError, ValueError):
+        return None
+    return year * 12 + month - 1 if year and 1 <= month <= 12 else None
+
+
+class StatisticsMatrix:
+    # counts[вид, регион, месяц]; месяц — порядковый номер year * 12 + (month - 1) от first_month
+    def __init__(self, region_ids: np.ndarray, first_month: int, counts: np.ndarray, rolling_window: int = 3):
+        self.region_ids = region_ids
+        self.first_month = first_month
+        self.counts = counts
+        self._rows = {int(region_id): row for row, region_id in enumerate(region_ids)}
+
+        previous_month = _shift(counts, 1)
+        previous_year = _shift(counts, 12)
+        self.mom = _growth(counts, previous_month)
+        self.mom[..., :1] = np.nan
+        self.yoy = _growth(counts, previous_year)
+        self.yoy[..., :12] = np.nan
+
+        cumulative = np.cumsum(counts, axis=-1, dtype=np.float64)
+        window_sums = cumulative - _shift(cumulative, rolling_window)
+        self.rolling = window_sums / np.minimum(np.arange(1, counts.shape[-1] + 1), rolling_window)
+
+        self.national = counts.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.share = np.where(self.national[:, None, :] > 0, counts * 100.0 / self.national[:, None, :], np.nan)
+
+        # место в рейтинге по числу полётов за каждый месяц (1 — лидер)
+        order = np.argsort(-counts, axis=1, kind="stable")
+        self.rank = np.empty_like(order)
+        np.put_along_axis(self.rank, order, np.arange(1, counts.shape[1] + 1)[None, :, None], axis=1)
+
+    @classmethod
+    def build(cls, statistics: Iterable[Statistic]) -> Optional["StatisticsMatrix"]:
+        region_ids = []
+        entries = []
+        for row, statistic in enumerate(statistics):
+            region_ids.append(statistic.id)
+            series = (statistic.all_flights_months, statistic.fiz_flights_months, statistic.yur_flights_months)
+            for kind, months in enumerate(series):
+                for month in months:
+                    column = _month_column(month.year, month.month)
+                    if column is not None:
+                        entries.append((kind, row, column, month.flight_count or 0))
+        if not entries:
+            return None
+
+        entries = np.asarray(entries, dtype=np.int64)
+        first_month = int(entries[:, 2].min())
+        counts = np.zeros((len(KINDS), len(region_ids), int(entries[:, 2].max()) - first_month + 1), dtype=np.int64)
+        counts[entries[:, 0], entries[:, 1], entries[:, 2] - first_month] = entries[:, 3]
+        return cls(np.asarray(region_ids, dtype=np.int64), first_month, counts)
+
+    @property
+    def latest_month(self) -> int:
+        active = np.flatnonzero(self.national[0] > 0)
+        return int(active[-1]) if active.size else self.counts.shape[-1] - 1
+
+    def year_month(self, column: int):
+        year, month = divmod(self.first_month + column, 12)
+        return year, month + 1
+
+    def region_summary(self, region_id: int, kind: str = "all", column: Optional[int] = None) -> Optional[Dict]:
+        row = self._rows.get(int(region_id))
+        if row is None:
+            return None
+        k = KINDS.index(kind)
+        column = self.latest_month if column is None else column
+        year, month = self.year_month(column)
+
+        def value(array: np.ndarray) -> Optional[float]:
+            item = float(array[k, row, column])
+            return None if np.isnan(item) else round(item, 2)
+
+        return {
+            "year": year,
+            "month": month,
+            "flights": int(self.counts[k, row, column]),
+            "mom": value(self.mom),
+            "yoy": value(self.yoy),
+            "rolling": value(self.rolling),
+            "share": value(self.share),
+            "rank": int(self.rank[k, row, column])
+        }
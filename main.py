@@ -1,7 +1,9 @@
 import asyncio
+import logging
 
 from bot_assets.bot_create import main
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,54 @@
+import json
+import os
+from infrastructure.api_clients.catalog import Catalog, _join_cities
+
+
+SAMPLES = os.path.join(os.path.dirname(__file__), "..", "примеры ответов апи")
+
+
+def _regions():
+    with open(os.path.join(SAMPLES, "regions.json"), encoding="utf-8") as f:
+        return json.load(f)["data"]
+
+
+def _capital(regions, name):
+    return next(region["capital"] for region in regions if (region.get("capital") or {}).get("name") == name)
+
+
+def test_shared_capitals_follow_codes():
+    regions = _regions()
+    cities = [_capital(regions, name) for name in ("Тюмень", "Архангельск", "Москва")]
+    city_regions, region_cities = _join_cities(regions, cities)
+
+    assert {city["name"]: city_regions[city["id"]]["id"] for city in cities} == {
+        "Тюмень": 72,
+        "Архангельск": 29,
+        "Москва": 77,
+    }
+    assert [city["name"] for city in region_cities[77]] == ["Москва"]
+    assert region_cities[50] == []
+
+
+def test_oktmo_separates_autonomous_okrugs():
+    regions = _regions()
+    cities = [
+        {"id": 1, "name": "Салехард", "okato": "71171000000", "oktmo": "71951000001"},
+        {"id": 2, "name": "Ханты-Мансийск", "okato": "71131000000", "oktmo": "71871000001"},
+        {"id": 3, "name": "Нарьян-Мар", "okato": "11111000000", "oktmo": "11851000001"},
+    ]
+    city_regions, _ = _join_cities(regions, cities)
+    assert {city["name"]: city_regions[city["id"]]["name"] for city in cities} == {
+        "Салехард": "Ямало-Ненецкий",
+        "Ханты-Мансийск": "Ханты-Мансийский",
+        "Нарьян-Мар": "Ненецкий",
+    }
+
+
+def test_name_and_code_lookups_are_separate():
+    catalog = Catalog()
+    catalog.load(_regions(), [])
+
+    assert catalog.find_region_by_name("Красноярский")["id"] == 24
+    assert catalog.find_region_by_code("24")["id"] == 24
+    assert catalog.find_region_by_code("Красноярский") is None
+    assert catalog.find_region_by_name("24") is None
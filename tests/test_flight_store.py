@@ -0,0 +1,109 @@
+import asyncio
+import json
+import os
+import numpy as np
+from datetime import date
+from infrastructure.duration_sketch import DurationIndex
+from infrastructure.flight_store import FLIGHT_DTYPE, FlightStore, day_number, day_to_date, flight_to_row, merge_records
+from infrastructure.range_index import RangeIndex
+
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def _flights():
+    with open(os.path.join(FIXTURES, "flight_page.json"), encoding="utf-8") as f:
+        return json.load(f)["data"]
+
+
+def _records(flights):
+    return np.array([flight_to_row(flight) for flight in flights], dtype=FLIGHT_DTYPE)
+
+
+def test_flight_to_row_reads_api_record():
+    row = flight_to_row(_flights()[0])   # id 10001: 2025-03-20, 10:10 -> 13:44, 5601N03543E, регион 50
+    flight_id, region, day, kind, duration, lat, lon = row
+    assert (flight_id, region, day, kind, duration) == (10001, 50, day_number(date(2025, 3, 20)), -1, 3 * 3600 + 34 * 60)
+    assert abs(lat - (56 + 1 / 60)) < 1e-9
+    assert abs(lon - (35 + 43 / 60)) < 1e-9
+
+
+def test_every_fixture_record_is_parsed():
+    rows = [flight_to_row(flight) for flight in _flights()]
+    assert all(row is not None for row in rows)
+    assert all(row[4] > 0 for row in rows)
+
+
+def test_duration_past_midnight_and_end_of_day():
+    flight = dict(_flights()[0])
+    assert flight_to_row({**flight, "dep_time": "22:30:00", "arr_time": "01:00:00"})[4] == 2 * 3600 + 30 * 60
+    assert flight_to_row({**flight, "dep_time": "00:00:00", "arr_time": "24:00:00"})[4] == 24 * 3600
+    assert flight_to_row({**flight, "arr_time": None})[4] == -1
+
+
+def test_coordinates_hemispheres_and_bad_values():
+    flight = dict(_flights()[0])
+    _, _, _, _, _, lat, lon = flight_to_row({**flight, "dep": "3352S07040W"})
+    assert lat < 0 and lon < 0
+    _, _, _, _, _, lat, lon = flight_to_row({**flight, "dep": "ZZZZ"})
+    assert np.isnan(lat) and np.isnan(lon)
+
+
+def test_flight_without_date_is_skipped():
+    assert flight_to_row({**_flights()[0], "dof": None}) is None
+
+
+def test_merge_records_keeps_newer_duplicate():
+    records = _records(_flights()[:3])
+    newer = records[:1].copy()
+    newer["duration"] = 60
+    merged = merge_records(records, newer)
+    assert len(merged) == 3
+    assert merged[merged["id"] == records[0]["id"]]["duration"][0] == 60
+    assert np.all(np.diff(merged["day"]) >= 0)
+
+
+def test_append_and_read_round_trip(tmp_path):
+    store = FlightStore(str(tmp_path))
+    records = _records(_flights())
+    assert store.append(records) == len(records)
+    assert store.append(records[:2]) == 2      # повтор по id не даёт дублей
+
+    assert sorted(store.region_ids()) == sorted(set(records["region"].tolist()))
+    stored = np.concatenate([store.read(region_id) for region_id in store.region_ids()])
+    assert sorted(stored["id"].tolist()) == sorted(records["id"].tolist())
+
+    june = store.read(50, date(2025, 6, 1), date(2025, 6, 30))
+    assert len(june)
+    assert all(date(2025, 6, 1) <= day_to_date(day) <= date(2025, 6, 30) for day in june["day"])
+
+
+def test_months_ignore_interrupted_writes(tmp_path):
+    store = FlightStore(str(tmp_path))
+    store.append(_records(_flights()[:1]))
+    (tmp_path / "region_50" / "2025-04.npy.tmp.npy").write_bytes(b"")
+    assert store.months(50) == ["2025-03"]
+
+
+def test_duration_index_uses_parsed_durations(tmp_path):
+    store = FlightStore(str(tmp_path))
+    records = _records(_flights())
+    store.append(records)
+    index = DurationIndex(store)
+    index.rebuild(store.region_ids())
+    summary = index.rollup(store.region_ids()).summary()
+    assert summary["count"] == len(records)
+    assert summary["total"] == int(records["duration"].sum())
+    assert 0 < summary["median"] <= summary["p90"] <= summary["max"] == int(records["duration"].max())
+
+
+def test_range_index_is_filled_by_update_only(tmp_path):
+    store = FlightStore(str(tmp_path))
+    store.append(_records(_flights()))
+    index = RangeIndex(store)
+    assert index.query(50, date(2025, 1, 1), date(2025, 12, 31))["all"]["flights"] == 0   # промах не читает хранилище
+
+    asyncio.run(index.update(store.region_ids()))
+    stats = index.query(50, date(2025, 1, 1), date(2025, 12, 31))
+    assert stats["all"]["flights"] == len(store.read(50))
+    assert stats["all"]["duration"] == int(store.read(50)["duration"].sum())
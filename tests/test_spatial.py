@@ -0,0 +1,93 @@
+import asyncio
+import json
+import math
+import os
+import numpy as np
+from infrastructure.flight_store import FLIGHT_DTYPE, FlightStore, flight_to_row
+from infrastructure.spatial import EARTH_RADIUS_KM, CityDensity, CityIndex
+
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+CITIES = [
+    {"id": 1, "name": "Волоколамск", "lat": "56.0353", "lon": "35.9583"},
+    {"id": 2, "name": "Москва", "lat": "55.7558", "lon": "37.6173"},
+    {"id": 3, "name": "Санкт-Петербург", "lat": "59.9386", "lon": "30.3141"},
+    {"id": 4, "name": "Магнитогорск", "lat": "53.4071", "lon": "58.9791"},
+    {"id": 5, "name": "Владивосток", "lat": "43.1155", "lon": "131.8855"},
+    {"id": 6, "name": "Без координат", "lat": None, "lon": None},
+    {"id": 7, "name": "Кировск", "lat": "59.8753", "lon": "30.9814"},
+]
+
+
+def _flights():
+    with open(os.path.join(FIXTURES, "flight_page.json"), encoding="utf-8") as f:
+        return json.load(f)["data"]
+
+
+def _store(tmp_path, flights):
+    store = FlightStore(str(tmp_path))
+    store.append(np.array([flight_to_row(flight) for flight in flights], dtype=FLIGHT_DTYPE))
+    return store
+
+
+def _haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _expected(records, cities, max_km):
+    counts = {city["id"]: 0 for city in cities if city["lat"] is not None}
+    for lat, lon in zip(records["lat"], records["lon"]):
+        distance, city_id = min(
+            (_haversine(lat, lon, float(city["lat"]), float(city["lon"])), city["id"])
+            for city in cities if city["lat"] is not None
+        )
+        if distance <= max_km:
+            counts[city_id] += 1
+    return counts
+
+
+def test_density_counts_flights_by_departure_point(tmp_path):
+    store = _store(tmp_path, _flights())
+    density = CityDensity(store)
+    density.rebuild(CITIES, max_km=50)
+
+    records = np.concatenate([store.read(region_id) for region_id in store.region_ids()])
+    assert np.isfinite(records["lat"]).all() and np.isfinite(records["lon"]).all()
+    expected = _expected(records, CITIES, 50)
+    assert {city_id: density.flights(city_id) for city_id in expected} == expected
+    assert density.flights(1) == 2         # 10001 и 10002 вылетают из 5601N03543E
+    assert density.flights(2) > 0
+    assert density.flights(5) == 0
+    assert density.flights(6) is None
+
+
+def test_density_update_recounts_changed_regions(tmp_path):
+    flights = _flights()
+    store = _store(tmp_path, [flight for flight in flights if flight["region_id"] != 78])
+    density = CityDensity(store)
+    density.rebuild(CITIES)
+    assert density.flights(7) == 0
+
+    store.append(np.array([flight_to_row(flight) for flight in flights if flight["region_id"] == 78], dtype=FLIGHT_DTYPE))
+    asyncio.run(density.update(CITIES, [78]))
+    fresh = CityDensity(store)
+    fresh.rebuild(CITIES)
+    assert density.flights(7) > 0
+    assert {city["id"]: density.flights(city["id"]) for city in CITIES} == {city["id"]: fresh.flights(city["id"]) for city in CITIES}
+
+
+def test_nearest_matches_brute_force():
+    rng = np.random.default_rng(0)
+    lat, lon = rng.uniform(40, 70, 500), rng.uniform(20, 140, 500)
+    index = CityIndex(CITIES)
+    nearest, distance = index.nearest(lat, lon)
+    for i in range(len(lat)):
+        expected = min(
+            (_haversine(lat[i], lon[i], float(city["lat"]), float(city["lon"])), position)
+            for position, city in enumerate(index.cities)
+        )
+        assert nearest[i] == expected[1]
+        assert abs(distance[i] - expected[0]) < 1e-6
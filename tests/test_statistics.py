@@ -0,0 +1,59 @@
+import json
+import os
+from infrastructure.api_clients.city_client import BaseAPIClient
+from infrastructure.api_clients.models import MonthStatistic
+from infrastructure.stat_matrix import StatisticsMatrix
+
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def _report():
+    with open(os.path.join(FIXTURES, "statistics_region_24.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_statistic_from_api_payload():
+    statistic = BaseAPIClient()._build_statistic(24, "Красноярский край", _report())
+
+    assert statistic.total_flights_all == 4362
+    assert [(year.year, year.flight_count) for year in statistic.all_flights_years] == [(2024, 2225), (2025, 2137)]
+    assert all(isinstance(year.year, int) for year in statistic.all_flights_years)
+    # "06:01:38.373034" -> секунды, суммарное время — среднее на число полётов
+    assert statistic.all_flights_years[0].avg_time == 6 * 3600 + 60 + 38
+    assert statistic.all_flights_years[0].total_time == statistic.all_flights_years[0].avg_time * 2225
+
+    months = statistic.all_flights_months
+    assert (months[0].year, months[0].month, months[0].flight_count) == (2024, 1, 62)
+    assert all(isinstance(month.month, int) and isinstance(month.year, int) for month in months)
+    assert sorted(months, key=lambda month: (month.year, month.month)) == months
+
+
+def test_statistic_with_split_by_kind():
+    report = _report()
+    statistics = report["statistics"]
+    report["summary"]["total_flights"] = {"all": 4362, "fiz": 100, "yur": 200}
+    statistics["by_year"] = {"all": statistics["by_year"], "fiz": statistics["by_year"][:1], "yur": []}
+    statistic = BaseAPIClient()._build_statistic(24, None, report)
+
+    assert (statistic.total_flights_all, statistic.total_flights_fiz, statistic.total_flights_yur) == (4362, 100, 200)
+    assert [year.year for year in statistic.fiz_flights_years] == [2024]
+    assert statistic.yur_flights_years == []
+
+
+def test_matrix_from_api_payload():
+    statistic = BaseAPIClient()._build_statistic(24, "Красноярский край", _report())
+    matrix = StatisticsMatrix.build([statistic])
+
+    summary = matrix.region_summary(24, column=0)
+    assert (summary["year"], summary["month"], summary["flights"]) == (2024, 1, 62)
+
+
+def test_matrix_tolerates_unconverted_months():
+    statistic = BaseAPIClient()._build_statistic(24, None, _report())
+    statistic.all_flights_months = [
+        MonthStatistic(year="2024", month="2", flight_count=5, avg_time=0, total_time=0),
+        MonthStatistic(year="2024", month="x", flight_count=7, avg_time=0, total_time=0),
+    ]
+    matrix = StatisticsMatrix.build([statistic])
+    assert matrix.region_summary(24)["flights"] == 5
@@ -1,96 +1,287 @@
-import aiohttp
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+import asyncio
 from io import BytesIO
-from typing import List
-from configuration.config import API_BASE_URL
-from infrastructure.api_clients.city_client import APIClient
-import random
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+from configuration.config import (
+    REFRESH_CATALOG_INTERVAL,
+    REFRESH_STATISTICS_INTERVAL,
+    FLIGHT_SYNC_INTERVAL,
+    STATS_LOG_INTERVAL
+)
+from infrastructure.api_clients.async_client import AsyncAPIClient
+from infrastructure.api_clients.cache import response_cache
+from infrastructure.api_clients.catalog import catalog
+from infrastructure.api_clients.singleflight import upstream_calls
+from infrastructure.dataset import dataset
+from infrastructure.duration_sketch import duration_index
+from infrastructure.flight_store import flight_store
+from infrastructure.gen_image import generate_trend_line_chart
+from infrastructure.profiles import RegionProfile, profiles
+from infrastructure.range_index import range_index
+from infrastructure.ranking import ranking
+from infrastructure.render import render_service
+from infrastructure.rollup import rollup
+from infrastructure.scheduler import RefreshScheduler
+from infrastructure.spatial import city_density
 
 
 REGIONS = []
-RATING_REGIONS = {'72': '🔻1', '47': '🔻2', '79': '🔻3', '49': '🔻4', '70': '🔻5', '55': '🔻6', '7': '🔺7', '2': '🔺8', '10': '🔺9', '26': '🔻10', '83': '🔺11', '75': '🔻12', '37': '🔻13', '34': '🔺14', '35': '🔻15', '68': '🔺16', '40': '🔺17', '17': '🔻18', '69': '🔺19', '45': '🔺20', '56': '🔻21', '42': '🔺22', '19': '🔻23', '54': '🔻24', '59': '🔻25', '16': '🔺26', '66': '🔻27', '52': '🔻28', '1': '🔺29', '39': '🔻30', '22': '🔺31', '46': '🔺32', '80': '🔻33', '33': '🔺34', '14': '🔻35', '43': '🔺36', '5': '🔺37', '29': '🔻38', '76': '🔻39', '6': '🔺40', '23': '🔻41', '73': '🔺42', '41': '🔺43', '4': '🔺44', '51': '🔻45', '82': '🔻46', '81': '🔻47', '36': '🔻48', '24': '🔺49', '50': '🔺50', '77': '🔺51', '64': '🔺52', '63': '🔻53', '57': '🔻54', '15': '🔻55', '53': '🔺56', '32': '🔻57', '62': '🔻58', '38': '🔻59', '65': '🔺60', '3': '🔻61', '28': '🔺62', '71': '🔻63', '44': '🔻64', '13': '🔻65', '27': '🔺66', '25': '🔺67', '74': '🔻68', '58': '🔻69', '20': '🔻70', '21': '🔻71', '30': '🔻72', '8': '🔻73', '78': '🔺74', '60': '🔻75', '9': '🔺76', '18': '🔻77', '61': '🔻78', '48': '🔺79', '31': '🔺80', '67': '🔻81', '11': '🔻82', '12': '🔻83'}
-STATISTICS = []
-TOP = [{'id': 38, 'total': 2986, '2024': 2957, '2025': 29}, {'id': 38, 'total': 2986, '2024': 2957, '2025': 29}, {'id': 39, 'total': 1292, '2024': 1292}, {'id': 24, 'total': 4362, '2024': 2225, '2025': 2137}, {'id': 24, 'total': 4362, '2024': 2225, '2025': 2137}, {'id': 49, 'total': 441, '2025': 441}, {'id': 50, 'total': 14270, '2025': 14270}, {'id': 54, 'total': 4849, '2025': 4849}, {'id': 61, 'total': 5302, '2025': 5302}, {'id': 63, 'total': 7318, '2025': 7318}, {'id': 78, 'total': 9104, '2025': 9104}, {'id': 14, 'total': 1473, '2024': 1029, '2025': 444}, {'id': 14, 'total': 1473, '2024': 1029, '2025': 444}, {'id': 66, 'total': 9455, '2025': 9455}, {'id': 72, 'total': 40862, '2024': 22059, '2025': 18803}, {'id': 72, 'total': 40862, '2024': 22059, '2025': 18803}, {'id': 27, 'total': 3198, '2025': 3198}]
+_background_tasks = set()
+
+
+async def _revalidate_catalog(client: AsyncAPIClient):
+    if await catalog.revalidate(client):
+        REGIONS[:] = catalog.regions
+        rollup.build(catalog.regions)
+        profiles.rebuild()
 
 
 async def fetch_regions():
-    global REGIONS
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"{API_BASE_URL}/region") as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    REGIONS[:] = data.get("data", [])
-                    print(f"Загружено {len(REGIONS)} регионов")
-                    
-                else:
-                    print("Ошибка загрузки регионов:", resp.status)
-    except Exception as e:
-        print("Исключение при загрузке регионов:", e)
-
-
-
-
-def plot_flights_trend(flight_counts: List[int], labels: List[str] = None) -> BytesIO:
-    if not flight_counts:
-        raise ValueError("Список flight_counts не должен быть пустым")
-
-    n = len(flight_counts)
-    if labels is None:
-        labels = [str(i + 1) for i in range(n)]
-    elif len(labels) != n:
-        raise ValueError("Длина labels должна совпадать с длиной flight_counts")
-
-    plt.figure(figsize=(8, 4))
-    plt.plot(labels, flight_counts, marker='o', linestyle='-', linewidth=2, markersize=6, color='#1f77b4')
-    plt.title('Динамика количества полётов', fontsize=14)
-    plt.xlabel('Период', fontsize=12)
-    plt.ylabel('Количество полётов', fontsize=12)
-    plt.grid(True, linestyle='--', alpha=0.6)
-    plt.tight_layout()
-
-    buf = BytesIO()
-    plt.savefig(buf, format='png', dpi=150, bbox_inches='tight')
-    plt.close() 
-    buf.seek(0)
-    return buf
-
-
-def find_top_regions():
-    global TOP
-    top_regions = []
-    for region in STATISTICS:
-        d = {}
-        by_year = region.get('by_year')
-        region_id = region.get('id')
-        d['id'] = region_id
-        d['total'] = region.get('total_flights')
-        for year in by_year:
-            d[year.get('year')] = year.get('flight_count')
-            top_regions.append(d)
-    TOP [:] = top_regions
-    print('получен топ регионов')
-    print(TOP)
+    client = AsyncAPIClient()
+    # индексы по уже сохранённым полётам строим до сводок: запросы к ним хранилище не читают
+    stored = flight_store.region_ids()
+    await range_index.update(stored)
+    await duration_index.update(stored)
+    if catalog.load_snapshot():
+        # тёплый старт: отвечаем из снимка, сверяемся с API в фоне
+        task = asyncio.create_task(_revalidate_catalog(client))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+    else:
+        await catalog.revalidate(client)
+    REGIONS[:] = catalog.regions
+    rollup.build(catalog.regions)
+    profiles.rebuild()
+    print(f"Загружено {len(REGIONS)} регионов")
+
+
+
+
+async def refresh_statistics(client: AsyncAPIClient):
+    await dataset.refresh(client)
+    populations = {
+        region["id"]: int(region["population"])
+        for region in catalog.regions if str(region.get("population") or "").isdigit()
+    }
+    changed = ranking.apply(dataset.statistics.values(), populations)
+    rollup.update_regions(dataset.statistics)
+    profiles.rebuild()
+    print(f"Рейтинг обновлён, изменилось регионов: {changed}")
+
+
+async def sync_flights(client: AsyncAPIClient):
+    written = await flight_store.sync(client, [region["id"] for region in catalog.regions])
+    changed = [region_id for region_id, count in written.items() if count]
+    await range_index.update(changed)
+    await duration_index.update(changed)
+    rollup.update_regions(changed)
+    profiles.rebuild()
+    if changed or city_density.index is None:
+        await city_density.update(catalog.cities, changed)
+    print(f"Синхронизировано полётов: {sum(written.values())}")
+
+
+async def log_stats(scheduler: RefreshScheduler):
+    print(f"[Stats] Кэш ответов API: {response_cache.stats()}")
+    print(f"[Stats] Запросы к API: {upstream_calls.stats()}")
+    print(f"[Stats] Рендер графиков: {render_service.stats()}")
+    print(f"[Stats] Обновления: {scheduler.status()}")
+
+
+def create_refresh_scheduler() -> RefreshScheduler:
+    client = AsyncAPIClient()
+    scheduler = RefreshScheduler()
+    # справочник уже сверяется при старте в fetch_regions, поэтому первый запуск — через интервал
+    scheduler.add_job("catalog", lambda: _revalidate_catalog(client), REFRESH_CATALOG_INTERVAL, run_at_start=False)
+    scheduler.add_job("statistics", lambda: refresh_statistics(client), REFRESH_STATISTICS_INTERVAL)
+    scheduler.add_job("flights", lambda: sync_flights(client), FLIGHT_SYNC_INTERVAL)
+    scheduler.add_job("stats", lambda: log_stats(scheduler), STATS_LOG_INTERVAL, run_at_start=False)
+    return scheduler
 
 
+async def plot_flights_trend(flight_counts: List[int], labels: List[str] = None) -> BytesIO:
+    return BytesIO(await render_service.render(generate_trend_line_chart, flight_counts, labels))
+
 
 def get_top_10_by_total() -> dict:
-    for i in range(10):
-        region = RATING_REGIONS[i]
-    valid_regions = [
-        r for r in TOP
-        if r.get('id') is not None and isinstance(r.get('total'), int) and r['total'] > 0
+    return {entry.region_id: int(entry.value) for entry in ranking.top(10)}
+
+
+def _format_rank(rank: Optional[int], delta: Optional[int]) -> str:
+    if rank is None:
+        return "—"
+    if not delta:
+        return f"{rank}"
+    arrow = "🔺" if delta > 0 else "🔻"
+    return f"{rank} ({arrow}{abs(delta)})"
+
+
+def format_rank(region_id, metric: str = "total") -> str:
+    entry = ranking.rank(int(region_id), metric)
+    if entry is None:
+        return "—"
+    return _format_rank(entry.rank, entry.delta)
+
+
+def _format_percent(value) -> str:
+    if value is None:
+        return "—"
+    return f"🔺+{value}%" if value >= 0 else f"🔻{value}%"
+
+
+def _format_month_summary(summary: Optional[Dict]) -> str:
+    if summary is None:
+        return "нет данных"
+    return (
+        f"{summary['month']:02d}.{summary['year']}: {summary['flights']} полётов, "
+        f"{_format_percent(summary['mom'])} м/м, {_format_percent(summary['yoy'])} г/г, "
+        f"доля РФ {summary['share'] if summary['share'] is not None else '—'}%"
+    )
+
+
+RANGE_PERIODS = (7, 30, 90, 365)
+
+
+def range_window(region_id, days: int) -> Tuple[date, date]:
+    last_day = range_index.get(region_id).last_day or date.today()
+    return last_day - timedelta(days=days - 1), last_day
+
+
+def _format_duration(seconds: int) -> str:
+    hours, rest = divmod(int(seconds), 3600)
+    return f"{hours}:{rest // 60:02d}:{rest % 60:02d}"
+
+
+def format_range_stats(region_id, date_from: date, date_to: date, name: Optional[str] = None) -> str:
+    stats = range_index.query(int(region_id), date_from, date_to)
+    lines = [
+        f"📍 {name or f'ID {region_id}'}",
+        f"📆 {date_from.strftime('%d.%m.%Y')} — {date_to.strftime('%d.%m.%Y')}",
+        ""
     ]
+    labels = {"all": "🛫 Всего", "fiz": "👤 Физ. лица", "yur": "🏢 Юр. лица"}
+    # /flight не сообщает тип оператора: без разбивки строки физ./юр. лиц не показываем
+    if not stats["fiz"]["flights"] and not stats["yur"]["flights"]:
+        labels = {"all": labels["all"]}
+    for kind, label in labels.items():
+        flights, duration = stats[kind]["flights"], stats[kind]["duration"]
+        average = _format_duration(duration / flights) if flights else "—"
+        lines.append(f"{label}: {flights} полётов, налёт {_format_duration(duration)}, в среднем {average}")
+    if len(labels) == 1:
+        lines.append("👤🏢 Физ./юр. лица: в данных о полётах нет типа оператора")
+    return "\n".join(lines)
+
+
+def format_duration(seconds) -> str:
+    return "—" if seconds is None else _format_duration(seconds)
+
+
+def format_duration_percentiles(summary: Dict) -> str:
+    return (
+        f"{format_duration(summary['median'])} / {format_duration(summary['p90'])} / "
+        f"{format_duration(summary['p99'])} / {format_duration(summary['max'])}"
+    )
+
+
+TABLE_EMOJIS = ["🥇", "🥈", "🥉", "🔥", "📍", "📌", "🎯", "📈", "📊"]
+
+
+def format_regions_table(k: int = 15) -> str:
+    entries = ranking.top(k)
+    if not entries:
+        return "Рейтинг регионов ещё формируется, попробуйте позже."
+
+    blocks = [f"📊 ТОП-{k} РЕГИОНОВ ПО АКТИВНОСТИ БПЛА"]
+    for entry in entries:
+        region = catalog.get_region(entry.region_id) or {}
+        # полёты и часы — из одной статистики API; перцентили — из карточки, собранной при обновлении данных
+        hours = ranking.rank(entry.region_id, "hours")
+        profile = profiles.get(entry.region_id)
+        summary = profile.all_durations if profile and profile.all_durations.get("count") else None
+        mean = hours.value * 3600 / entry.value if hours and entry.value else None
+        yoy = ranking.rank(entry.region_id, "yoy")
+        per_capita = ranking.rank(entry.region_id, "per_capita")
+        emoji = TABLE_EMOJIS[entry.rank - 1] if entry.rank <= len(TABLE_EMOJIS) else "🌐"
+        blocks.append(
+            f"{emoji} #{entry.rank} {region.get('fullname', f'ID {entry.region_id}')}\n"
+            f"• Полёты: {int(entry.value)}\n"
+            f"• Длительность: {f'{round(hours.value)} ч' if hours else '—'}\n"
+            f"• Ср. время: {format_duration(mean)}\n"
+            f"• Медиана / p90 / p99 / макс: {format_duration_percentiles(summary) if summary else '—'}\n"
+            f"• Рост: {_format_percent(round(yoy.value, 2)) if yoy else '—'}\n"
+            f"• Плотность: {f'{round(per_capita.value, 1)} на 100 тыс. жителей' if per_capita else '—'}"
+        )
+    return "\n\n—\n\n".join(blocks)
+
+
+def format_region_card(profile: RegionProfile) -> str:
+    durations = profile.durations
+    return (
+        f"📍 {profile.name} (ID: {profile.id})\n\n"
+        f"🏆 Место в рейтинге: {_format_rank(profile.rank, profile.rank_delta)}  \n"
+        f"🛫 Всего полётов: {profile.total_flights if profile.total_flights is not None else '—'}  \n"
+        f"📈 Динамика за {_format_month_summary(profile.month)}  \n\n"
+
+        f"📊 Статистика за {profile.year or '—'}  \n"
+        f"🛫 Полётов за год: {profile.year_flights if profile.year_flights is not None else '—'}  \n"
+        f"⏱️ Средняя длительность: {format_duration(profile.avg_duration)}  \n"
+        f"⏱️ Медиана / p90 / p99 / макс: {format_duration_percentiles(durations)}  \n\n"
+
+        # TODO: заглушка — этих сведений о регионе в API нет, блок ниже одинаков для всех регионов
+        # ("Управление Росавиации по СЗФО", "Принята 20.12.2024", "12%" и т.д.)
+        "🏢 Ответственный орган:  \n"
+        "Управление  Росавиации по СЗФО\n\n"
+
+        "📌 Программа развития БАС\n"
+        "Принята 20.12.2024\n"
+
+        "📌 Наличие ЭПР\n"
+        "Есть\n"
+
+        "📌 Специализация региона\n"
+        "Система передачи данных с БВС\n"
+
+        "📌 Наличие работ по БЭК\n"
+        "Есть\n\n"
+
+        "📌 Наличие полигона БАС\n"
+        "Есть\n"
 
-    sorted_regions = sorted(valid_regions, key=lambda x: x['total'], reverse=True)
+        "📌 Наличие НПЦ\n"
+        "Крупный\n"
 
-    top_10 = {r['id']: r['total'] for r in sorted_regions[:10]}
-    return top_10
+        "📌 Процент оснащённости школ БАС,\n"
+        "12%\n"
 
+        f"📌 Столица: {profile.capital or 'Нет столицы'}  \n"
+        f"🗺️ Тип: {profile.type or '—'}  \n"
+        f"👥 Население: {profile.population or '—'}"
+    )
 
-    
 
+def format_city_card(city: Dict, region: Optional[Dict] = None) -> str:
+    lines = [f"🏙 {city['name']}"]
+    if region:
+        lines.append(f"📍 Регион: {region.get('fullname')}")
+    if city.get("is_capital"):
+        lines.append("⭐ Административный центр региона")
+    lines.append(f"👥 Население: {city.get('population') or '—'}")
+    if city.get("year_founded"):
+        lines.append(f"🏛 Основан: {city['year_founded']}")
+    if city.get("lat") and city.get("lon"):
+        lines.append(f"🧭 Координаты: {city['lat']}, {city['lon']}")
+    return "\n".join(lines)
 
 
+def format_region_cities(region: Dict, cities: List[Dict], limit: int = 20) -> str:
+    if not cities:
+        return f"🏙 Для региона «{region.get('fullname')}» нет данных о городах."
+    lines = [f"🏙 Города: {region.get('fullname')} (всего {len(cities)})", ""]
+    for i, city in enumerate(cities[:limit], 1):
+        mark = " ⭐" if city.get("is_capital") else ""
+        flights = city_density.flights(city["id"])
+        flights = f", {flights} полётов рядом" if flights else ""
+        lines.append(f"{i}. {city['name']}{mark} — {city.get('population') or '—'} чел.{flights}")
+    if len(cities) > limit:
+        lines.append(f"… и ещё {len(cities) - limit}")
+    return "\n".join(lines)